@@ -0,0 +1,3 @@
+#!/bin/bash
+
+python -m espn_ffb.db.poller -e docker
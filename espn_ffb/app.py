@@ -8,13 +8,14 @@ from espn_ffb.db.model.sackos import Sackos
 from espn_ffb.db.model.teams import Teams
 from espn_ffb.db.query import Query
 from espn_ffb.views.awards import awards
+from espn_ffb.views.changes import changes
 from espn_ffb.views.champions import champions
 from espn_ffb.views.h2h_records import h2h_records
 from espn_ffb.views.matchup_history import matchup_history
 from espn_ffb.views.playoffs import playoffs
 from espn_ffb.views.recap import recap
 from espn_ffb.views.standings import standings
-from flask import Flask, redirect
+from flask import Flask, abort, redirect, request, url_for
 import glob
 import logging
 import sys
@@ -24,6 +25,7 @@ LOG_FORMAT = "%(asctime)s %(levelname)s %(pathname)s %(lineno)d: %(message)s"
 app = Flask(__name__)
 app.config.from_object(util.get_config(sys.argv[2]))
 app.register_blueprint(awards)
+app.register_blueprint(changes)
 app.register_blueprint(champions)
 app.register_blueprint(h2h_records)
 app.register_blueprint(matchup_history)
@@ -34,7 +36,7 @@ app.static_folder = "web/static"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_DATABASE_URI'] = app.config.get("DB_URI")
 db.init_app(app)
-query = Query(db)
+query = Query(db, league_id=app.config.get("LEAGUE_ID"), upsert_batch_size=app.config.get("UPSERT_BATCH_SIZE"))
 app.config['QUERY'] = query
 
 
@@ -68,8 +70,10 @@ def get_template_path_vars_for_nav(relative_path, pattern, splitter=None):
 
 @app.context_processor
 def utility_processor():
+    league_id = (request.view_args or {}).get("league_id")
     return dict(
-        years=query.get_distinct_years(),
+        league_id=league_id,
+        years=util.get_query(league_id).get_distinct_years(),
         recap_templates_year_weeks=get_template_path_vars_for_nav(
             "espn_ffb/templates/recap/", "*/*/", '/'
         ),
@@ -93,9 +97,13 @@ def setup_logging():
 
 
 @app.route('/', methods=['GET'])
-def show_index():
-    current_year = query.get_distinct_years()[0]
-    return redirect(f"/awards/{current_year}", code=302)
+@app.route('/leagues/<int:league_id>', methods=['GET'])
+def show_index(league_id=None):
+    years = util.get_query(league_id).get_distinct_years()
+    if not years:
+        abort(503, "No seasons have been loaded yet")
+    current_year = years[0]
+    return redirect(url_for('awards.show', year=current_year, league_id=league_id), code=302)
 
 
 if __name__ == "__main__":
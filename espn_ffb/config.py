@@ -9,12 +9,38 @@ def get_db_uri(user, password, host, port, dbname):
 
 class Config(object):
     LEAGUE_ID = 123456
+    # every league to ingest and serve, LEAGUE_ID is the default league of the unscoped routes
+    LEAGUE_IDS = [LEAGUE_ID]
     CURRENT_YEAR = 2019
     DB_URI = ""
     COOKIES = {
         "swid": "{your_swid}",
         "espn_s2": "your_espn_s2"
     }
+    FETCH_MIN_WORKERS = 1
+    FETCH_MAX_WORKERS = 8
+    FETCH_TARGET_LATENCY = 2.0
+    FETCH_RATE = 10
+    FETCH_BURST = 8
+    FETCH_MAX_RETRIES = 5
+    FETCH_BACKOFF_BASE = 0.5
+    FETCH_BACKOFF_MAX = 30
+    FETCH_TIMEOUT = 30
+    FETCH_COMBINED_VIEWS = True
+    # keep the raw ESPN JSON on every parsed model, e.g. to print_attributes while debugging
+    KEEP_RAW_DATA = False
+    UPSERT_BATCH_SIZE = 500
+    # seasons buffered between the fetch, parse, transform and write stages of a full load
+    PIPELINE_QUEUE_SIZE = 2
+    CACHE_DIR = "/var/cache/espn-ffb"
+    CACHE_MAX_BYTES = 256 * 1024 * 1024
+    CACHE_TTL = 300
+    POLL_INTERVAL_LIVE = 30
+    POLL_INTERVAL_IDLE = 900
+    # (weekday, start hour, end hour) in UTC: Thursday, Sunday and Monday night games
+    POLL_GAME_WINDOWS = [(4, 0, 5), (6, 13, 24), (0, 0, 5), (1, 0, 5)]
+    # turn off to not wait for each poller commit to reach disk, a crash may lose the last syncs until the next poll
+    POLL_SYNCHRONOUS_COMMIT = True
     config_dir = "/etc/opt/espn-ffb"
     log_base_dir = "/var/log/espn-ffb"
 
@@ -30,6 +56,7 @@ class Config(object):
 class DevConfig(Config):
     config_dir = "conf"
     log_base_dir = "log"
+    CACHE_DIR = "cache"
     # console_level = 10
 
     dbname = "your_dev_db"
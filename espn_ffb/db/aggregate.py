@@ -0,0 +1,238 @@
+from collections import defaultdict
+from espn_ffb.db.model.matchups import Matchups
+from espn_ffb.db.model.owner_pairs import OwnerPairs
+from espn_ffb.db.model.owner_seasons import OwnerSeasons
+from espn_ffb.db.model.records import Records
+from espn_ffb.db.model.team_weeks import TeamWeeks
+import logging
+from sqlalchemy import and_, case, func, not_, true, union
+from typing import Dict, Iterable, List, Mapping, Set
+
+# the tables the aggregates are derived from, any write to them must refresh the aggregates in the same transaction
+SOURCE_MODELS = (Matchups, Records)
+
+
+def get_league_years(rows: Iterable[Mapping]) -> Dict[int, Set[int]]:
+    """
+    Get the seasons touched by a set of written rows.
+
+    :param rows: dicts of column name to value, each with a league_id and a year
+    :return: dict of league ID to set of years
+    """
+    league_years = defaultdict(set)
+    for row in rows:
+        league_years[row["league_id"]].add(row["year"])
+    return league_years
+
+
+def get_all_league_years(session) -> Dict[int, Set[int]]:
+    """
+    Select every season with records or matchups.
+
+    :param session: the database session
+    :return: dict of league ID to set of years
+    """
+    seasons = union(
+        session.query(Records.league_id, Records.year).statement,
+        session.query(Matchups.league_id, Matchups.year).statement,
+    )
+    return get_league_years(dict(league_id=league_id, year=year)
+                            for league_id, year in session.execute(seasons))
+
+
+def count_if(condition):
+    return func.sum(case([(condition, 1)], else_=0))
+
+
+def get_owner_ids(session, league_id: int, years: Set[int]) -> Set[str]:
+    """
+    Select the owners who played in the given seasons.
+
+    :param session: the database session
+    :param league_id: the league ID
+    :param years: set of years
+    :return: set of owner IDs
+    """
+    owner_ids = session.query(Matchups.owner_id).distinct() \
+        .filter(Matchups.league_id == league_id, Matchups.year.in_(years))
+    return {owner_id for (owner_id,) in owner_ids}
+
+
+def refresh(session, league_years: Mapping[int, Set[int]]) -> Dict[type, List[Mapping]]:
+    """
+    Recompute the aggregates of the given seasons from records and matchups.
+
+    Owner-season totals and team-week snapshots are recomputed for the given seasons only, and head-to-head totals for
+    every owner who played in them, so a weekly update touches a few hundred aggregate rows at most. The caller
+    commits, so the aggregates are written in the same transaction as the rows they are derived from.
+
+    :param session: the database session
+    :param league_years: dict of league ID to set of years
+    :return: dict of aggregate model to the leading primary key columns of the refreshed rows, e.g. league and year
+    """
+    refreshed = defaultdict(list)
+    for league_id, years in league_years.items():
+        if not years:
+            continue
+        owner_ids = get_owner_ids(session, league_id, years)
+        refresh_owner_seasons(session, league_id, years)
+        refresh_team_weeks(session, league_id, years)
+        refresh_owner_pairs(session, league_id, owner_ids)
+
+        for model in (OwnerSeasons, TeamWeeks):
+            refreshed[model].extend(dict(league_id=league_id, year=year) for year in sorted(years))
+        refreshed[OwnerPairs].extend(dict(league_id=league_id, owner_id=owner_id) for owner_id in sorted(owner_ids))
+    return refreshed
+
+
+def refresh_all(session):
+    """
+    Recompute every aggregate from records and matchups.
+
+    :param session: the database session
+    :return: None
+    """
+    refresh(session, get_all_league_years(session))
+
+
+def refresh_owner_seasons(session, league_id: int, years: Set[int]):
+    """
+    Recompute the regular season and playoff totals of every owner in the given seasons.
+
+    :param session: the database session
+    :param league_id: the league ID
+    :param years: set of years
+    :return: None
+    """
+    session.query(OwnerSeasons) \
+        .filter(OwnerSeasons.league_id == league_id, OwnerSeasons.year.in_(years)) \
+        .delete(synchronize_session=False)
+
+    regular = session.query(
+        Records.league_id,
+        Records.year,
+        Records.owner_id,
+        func.sum(Records.wins).label("wins"),
+        func.sum(Records.losses).label("losses"),
+        func.sum(Records.ties).label("ties"),
+        func.sum(Records.points_for).label("points_for"),
+        func.sum(Records.points_against).label("points_against"),
+    ).filter(Records.league_id == league_id, Records.year.in_(years)) \
+        .group_by(Records.league_id, Records.year, Records.owner_id) \
+        .subquery()
+
+    playoffs = session.query(
+        Matchups.league_id,
+        Matchups.year,
+        Matchups.owner_id,
+        func.count().label("games"),
+        count_if(Matchups.is_win.is_(True)).label("wins"),
+        count_if(Matchups.is_loss.is_(True)).label("losses"),
+        count_if(Matchups.team_score == Matchups.opponent_team_score).label("ties"),
+        func.sum(Matchups.team_score).label("points_for"),
+        func.sum(Matchups.opponent_team_score).label("points_against"),
+    ).filter(Matchups.league_id == league_id, Matchups.year.in_(years), Matchups.is_playoffs,
+             Matchups.opponent_owner_id.isnot(None)) \
+        .group_by(Matchups.league_id, Matchups.year, Matchups.owner_id) \
+        .subquery()
+
+    owner_seasons = session.query(
+        regular.c.league_id,
+        regular.c.year,
+        regular.c.owner_id,
+        regular.c.wins,
+        regular.c.losses,
+        regular.c.ties,
+        regular.c.points_for,
+        regular.c.points_against,
+        func.coalesce(playoffs.c.games, 0),
+        func.coalesce(playoffs.c.wins, 0),
+        func.coalesce(playoffs.c.losses, 0),
+        func.coalesce(playoffs.c.ties, 0),
+        func.coalesce(playoffs.c.points_for, 0),
+        func.coalesce(playoffs.c.points_against, 0),
+    ).outerjoin(playoffs, and_(regular.c.league_id == playoffs.c.league_id, regular.c.year == playoffs.c.year,
+                               regular.c.owner_id == playoffs.c.owner_id))
+
+    columns = [c.name for c in OwnerSeasons.__table__.columns]
+    count = session.execute(OwnerSeasons.__table__.insert().from_select(columns, owner_seasons.statement)).rowcount
+    logging.debug(f"Refreshed {count} owner seasons of league {league_id} for {sorted(years)}")
+
+
+def refresh_team_weeks(session, league_id: int, years: Set[int]):
+    """
+    Recompute the cumulative record and points of every team as of the end of every matchup period of the given
+    seasons.
+
+    Every team gets a row for every matchup period of its season, including the periods it did not play, so the
+    standings as of any week are read from that week's rows alone. Pending matchups are not counted.
+
+    :param session: the database session
+    :param league_id: the league ID
+    :param years: set of years
+    :return: None
+    """
+    session.query(TeamWeeks) \
+        .filter(TeamWeeks.league_id == league_id, TeamWeeks.year.in_(years)) \
+        .delete(synchronize_session=False)
+
+    season_matchups = session.query(Matchups).filter(Matchups.league_id == league_id, Matchups.year.in_(years))
+    teams = season_matchups.with_entities(Matchups.league_id, Matchups.year, Matchups.team_id).distinct().subquery()
+    periods = season_matchups.with_entities(Matchups.league_id, Matchups.year, Matchups.matchup_id).distinct() \
+        .subquery()
+
+    is_decided = and_(not_(Matchups.is_pending), Matchups.opponent_team_score.isnot(None))
+
+    def running_sum(condition, value=1):
+        return func.sum(case([(and_(is_decided, condition), value)], else_=0)) \
+            .over(partition_by=(teams.c.league_id, teams.c.year, teams.c.team_id), order_by=periods.c.matchup_id)
+
+    team_weeks = session.query(
+        teams.c.league_id,
+        teams.c.year,
+        periods.c.matchup_id,
+        teams.c.team_id,
+        running_sum(Matchups.team_score > Matchups.opponent_team_score),
+        running_sum(Matchups.team_score < Matchups.opponent_team_score),
+        running_sum(Matchups.team_score == Matchups.opponent_team_score),
+        running_sum(true(), Matchups.team_score),
+        running_sum(true(), Matchups.opponent_team_score),
+    ).join(periods, and_(teams.c.league_id == periods.c.league_id, teams.c.year == periods.c.year)) \
+        .outerjoin(Matchups, and_(Matchups.league_id == teams.c.league_id, Matchups.year == teams.c.year,
+                                  Matchups.matchup_id == periods.c.matchup_id, Matchups.team_id == teams.c.team_id))
+
+    columns = [c.name for c in TeamWeeks.__table__.columns]
+    count = session.execute(TeamWeeks.__table__.insert().from_select(columns, team_weeks.statement)).rowcount
+    logging.debug(f"Refreshed {count} team weeks of league {league_id} for {sorted(years)}")
+
+
+def refresh_owner_pairs(session, league_id: int, owner_ids: Set[str]):
+    """
+    Recompute the head-to-head totals of the given owners against every opponent.
+
+    :param session: the database session
+    :param league_id: the league ID
+    :param owner_ids: set of owner IDs
+    :return: None
+    """
+    if not owner_ids:
+        return
+
+    session.query(OwnerPairs) \
+        .filter(OwnerPairs.league_id == league_id, OwnerPairs.owner_id.in_(owner_ids)) \
+        .delete(synchronize_session=False)
+
+    owner_pairs = session.query(
+        Matchups.league_id,
+        Matchups.owner_id,
+        Matchups.opponent_owner_id,
+        Matchups.is_playoffs,
+        count_if(Matchups.is_win.is_(True)),
+        count_if(Matchups.is_loss.is_(True)),
+    ).filter(Matchups.league_id == league_id, Matchups.owner_id.in_(owner_ids), not_(Matchups.is_pending),
+             not_(Matchups.is_consolation), Matchups.opponent_owner_id.isnot(None)) \
+        .group_by(Matchups.league_id, Matchups.owner_id, Matchups.opponent_owner_id, Matchups.is_playoffs)
+
+    columns = [c.name for c in OwnerPairs.__table__.columns]
+    count = session.execute(OwnerPairs.__table__.insert().from_select(columns, owner_pairs.statement)).rowcount
+    logging.debug(f"Refreshed {count} owner pairs of league {league_id}")
@@ -0,0 +1,145 @@
+import numpy as np
+from typing import Iterable, NamedTuple, Optional, Sequence, Tuple
+
+# the matchups columns loaded into arrays, in select order
+MATCHUP_COLUMNS = ("year", "matchup_id", "team_id", "owner_id", "opponent_team_id", "opponent_owner_id", "team_score",
+                   "opponent_team_score", "is_win", "is_loss", "is_pending", "is_playoffs", "is_consolation")
+# the index of a missing owner or team, e.g. the opponent of a bye
+NO_INDEX = -1
+
+
+class MatchupArrays(NamedTuple):
+    # sorted owner IDs, the owner and opponent arrays index into it
+    owner_ids: np.ndarray
+    year: np.ndarray
+    matchup_id: np.ndarray
+    team_id: np.ndarray
+    opponent_team_id: np.ndarray
+    owner: np.ndarray
+    opponent: np.ndarray
+    # scores in integer hundredths of a point, so sums are exact
+    team_score: np.ndarray
+    opponent_team_score: np.ndarray
+    is_win: np.ndarray
+    is_loss: np.ndarray
+    is_pending: np.ndarray
+    is_playoffs: np.ndarray
+    is_consolation: np.ndarray
+
+    @property
+    def has_opponent(self) -> np.ndarray:
+        return self.opponent != NO_INDEX
+
+
+class PairSummaries(NamedTuple):
+    wins: np.ndarray
+    losses: np.ndarray
+    streak: np.ndarray
+    # whether the current streak is a win streak, only meaningful where the streak is not 0
+    streak_is_win: np.ndarray
+
+
+def to_cents(scores: Sequence) -> np.ndarray:
+    return np.rint(np.array([0 if s is None else s for s in scores], dtype=np.float64) * 100).astype(np.int64)
+
+
+def load_matchups(rows: Iterable[Sequence]) -> MatchupArrays:
+    """
+    Load matchup rows into columnar arrays.
+
+    :param rows: tuples of matchups column values, in the order of MATCHUP_COLUMNS
+    :return: the matchup arrays
+    """
+    rows = list(rows)
+    columns = dict(zip(MATCHUP_COLUMNS, zip(*rows) if rows else [()] * len(MATCHUP_COLUMNS)))
+    owner_ids = sorted({o for o in columns["owner_id"] + columns["opponent_owner_id"] if o is not None})
+    owner_id_to_index = dict((owner_id, i) for i, owner_id in enumerate(owner_ids))
+
+    def to_ints(values: Sequence) -> np.ndarray:
+        return np.array([NO_INDEX if v is None else v for v in values], dtype=np.int64)
+
+    def to_owners(values: Sequence) -> np.ndarray:
+        return np.array([owner_id_to_index.get(v, NO_INDEX) for v in values], dtype=np.int64)
+
+    return MatchupArrays(
+        owner_ids=np.array(owner_ids, dtype=str),
+        year=to_ints(columns["year"]),
+        matchup_id=to_ints(columns["matchup_id"]),
+        team_id=to_ints(columns["team_id"]),
+        opponent_team_id=to_ints(columns["opponent_team_id"]),
+        owner=to_owners(columns["owner_id"]),
+        opponent=to_owners(columns["opponent_owner_id"]),
+        team_score=to_cents(columns["team_score"]),
+        opponent_team_score=to_cents(columns["opponent_team_score"]),
+        **dict((c, np.array(columns[c], dtype=bool))
+               for c in ("is_win", "is_loss", "is_pending", "is_playoffs", "is_consolation"))
+    )
+
+
+def get_owner_indexes(arrays: MatchupArrays, owner_ids: Sequence[Optional[str]]) -> np.ndarray:
+    """
+    Get the indexes of owner IDs into the owner arrays.
+
+    :param arrays: the matchup arrays
+    :param owner_ids: list of owner IDs
+    :return: array of owner indexes, NO_INDEX for unknown owners
+    """
+    owner_ids = np.array(["" if o is None else o for o in owner_ids], dtype=str)
+    indexes = np.searchsorted(arrays.owner_ids, owner_ids)
+    found = indexes < len(arrays.owner_ids)
+    found[found] = arrays.owner_ids[indexes[found]] == owner_ids[found]
+    return np.where(found, indexes, NO_INDEX)
+
+
+def get_pair_summaries(arrays: MatchupArrays, owners: np.ndarray, opponents: np.ndarray,
+                       exclude: Optional[Tuple[int, int]] = None) -> PairSummaries:
+    """
+    Get the regular season head-to-head record and current streak of owner and opponent pairs.
+
+    Ties count as losses. The streak is the run of equal results at the start of each history, ordered by year
+    descending then matchup period, like Query.get_matchup_history.
+
+    :param arrays: the matchup arrays
+    :param owners: array of owner indexes
+    :param opponents: array of opponent owner indexes, aligned with the owners
+    :param exclude: (year, matchup period ID) of a matchup period left out of the histories
+    :return: pair summaries, aligned with the owners
+    """
+    mask = ~arrays.is_pending & ~arrays.is_consolation & ~arrays.is_playoffs & arrays.has_opponent
+    if exclude is not None:
+        mask &= ~((arrays.year == exclude[0]) & (arrays.matchup_id == exclude[1]))
+
+    owner_count = len(arrays.owner_ids)
+    order = np.lexsort((arrays.matchup_id[mask], -arrays.year[mask],
+                        arrays.owner[mask] * owner_count + arrays.opponent[mask]))
+    pair = (arrays.owner[mask] * owner_count + arrays.opponent[mask])[order]
+    is_win = arrays.is_win[mask][order]
+
+    is_start = np.ones(len(pair), dtype=bool)
+    is_start[1:] = pair[1:] != pair[:-1]
+    starts = np.flatnonzero(is_start)
+    sizes = np.diff(np.append(starts, len(pair)))
+    group = np.cumsum(is_start) - 1
+
+    is_break = np.zeros(len(pair), dtype=bool)
+    is_break[1:] = (is_win[1:] != is_win[:-1]) & ~is_start[1:]
+    position = np.arange(len(pair)) - starts[group]
+    streaks = sizes.copy()
+    np.minimum.at(streaks, group[is_break], position[is_break])
+    wins = np.add.reduceat(is_win.astype(np.int64), starts) if len(starts) else np.zeros(0, dtype=np.int64)
+
+    pairs = np.where((owners == NO_INDEX) | (opponents == NO_INDEX), NO_INDEX, owners * owner_count + opponents)
+    found_group = np.searchsorted(pair[starts], pairs)
+    found = (pairs != NO_INDEX) & (found_group < len(starts))
+    found[found] = pair[starts][found_group[found]] == pairs[found]
+    found_group = np.where(found, found_group, 0)
+
+    def take(values: np.ndarray) -> np.ndarray:
+        return np.where(found, values[found_group], 0) if len(starts) else np.zeros(len(pairs), dtype=values.dtype)
+
+    return PairSummaries(
+        wins=take(wins),
+        losses=take(sizes - wins),
+        streak=take(streaks),
+        streak_is_win=take(is_win[starts]).astype(bool),
+    )
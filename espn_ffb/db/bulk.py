@@ -0,0 +1,125 @@
+import csv
+from espn_ffb.db import fingerprint
+import io
+from itertools import islice
+import logging
+from sqlalchemy import text
+from typing import Iterable, Iterator, Mapping, Sequence
+
+BULK_BATCH_SIZE = 1000
+COPY_NULL = r"\N"
+
+
+class CsvStream(io.RawIOBase):
+    def __init__(self, rows: Iterable[Mapping], columns: Sequence[str]):
+        """
+        Initialize a read-only file object that encodes rows as CSV on demand, so COPY can stream them without the
+        whole load being materialized in memory.
+
+        :param rows: dicts of column name to value
+        :param columns: the column names, in COPY order
+        """
+        self.columns = columns
+        self.count = 0
+        self._rows = iter(rows)
+        self._buffer = b""
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text, lineterminator="\n")
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow([COPY_NULL if row[c] is None else row[c] for c in self.columns])
+            self._buffer += self._text.getvalue().encode("utf-8")
+            self._text.seek(0)
+            self._text.truncate()
+            self.count += 1
+
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def load(session, model, rows: Iterable[Mapping], batch_size: int = BULK_BATCH_SIZE) -> int:
+    """
+    Bulk load rows into a model's table, merging them into any existing rows with the same primary key.
+
+    On PostgreSQL the rows are streamed with COPY FROM STDIN into a temporary staging table and merged with a single
+    INSERT ... ON CONFLICT DO UPDATE. On other dialects they are sent as batched INSERTs, without the merge. The
+    fingerprint column, if the model has one, is computed here. The caller commits.
+
+    :param session: the database session
+    :param model: the model class, with a PKEY_NAME constraint
+    :param rows: dicts of column name to value, e.g. from the espn.api row generators
+    :param batch_size: the number of rows per batch on dialects without COPY
+    :return: the number of rows loaded
+    """
+    rows = (fingerprint.add_fingerprint(model, row) for row in rows)
+    if session.get_bind().dialect.name == "postgresql":
+        count = copy_merge(session, model, rows)
+    else:
+        count = insert_batches(session, model, rows, batch_size)
+    logging.info(f"Loaded {count} rows into {model.__tablename__}")
+    return count
+
+
+def copy_merge(session, model, rows: Iterable[Mapping]) -> int:
+    """
+    Stream rows into a staging table with COPY FROM STDIN and merge them into the model's table.
+
+    :param session: the database session
+    :param model: the model class, with a PKEY_NAME constraint
+    :param rows: dicts of column name to value
+    :return: the number of rows loaded
+    """
+    table = model.__table__.name
+    staging = f"{table}_staging"
+    columns = [c.name for c in model.__table__.columns]
+    column_list = ", ".join(columns)
+    updates = ", ".join(f"{c.name} = excluded.{c.name}" for c in model.__table__.columns if not c.primary_key)
+
+    session.execute(text(f"CREATE TEMPORARY TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"))
+
+    stream = CsvStream(rows, columns)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                           stream)
+    finally:
+        cursor.close()
+
+    session.execute(text(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} "
+                         f"ON CONFLICT ON CONSTRAINT {model.PKEY_NAME} DO UPDATE SET {updates}"))
+    session.execute(text(f"DROP TABLE {staging}"))
+    return stream.count
+
+
+def insert_batches(session, model, rows: Iterable[Mapping], batch_size: int) -> int:
+    """
+    Insert rows with one executemany INSERT per batch.
+
+    :param session: the database session
+    :param model: the model class
+    :param rows: dicts of column name to value
+    :param batch_size: the number of rows per batch
+    :return: the number of rows inserted
+    """
+    count = 0
+    for batch in get_batches(rows, batch_size):
+        session.execute(model.__table__.insert(), batch)
+        count += len(batch)
+    return count
+
+
+def get_batches(rows: Iterable[Mapping], batch_size: int) -> Iterator[Sequence[Mapping]]:
+    rows = iter(rows)
+    batch = list(islice(rows, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, batch_size))
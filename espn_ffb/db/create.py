@@ -1,8 +1,10 @@
 import argparse
 from espn_ffb import util
+from espn_ffb.db import migrate
 from espn_ffb.db.database import db
 # noinspection PyUnresolvedReferences
-from espn_ffb.db.model import champions, matchups, owners, records, sackos, teams
+from espn_ffb.db.model import champions, changes, matchups, owner_pairs, owner_seasons, owners, records, sackos, \
+    schema_migrations, sync_state, team_weeks, teams
 from flask import Flask
 import logging
 from typing import Mapping
@@ -38,6 +40,8 @@ def main():
         db.drop_all()
         logging.info("Creating tables")
         db.create_all()
+        # the new tables already match the latest migration
+        migrate.stamp(db.session)
 
 
 if __name__ == "__main__":
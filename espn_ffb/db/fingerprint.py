@@ -0,0 +1,54 @@
+from decimal import Decimal
+import hashlib
+from typing import Any, Dict, Mapping, Tuple
+
+FINGERPRINT_COLUMN = "fingerprint"
+
+
+def has_fingerprint(model) -> bool:
+    return FINGERPRINT_COLUMN in model.__table__.columns
+
+
+def normalize(value: Any) -> str:
+    if value is None:
+        return "\x00"
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    return str(value)
+
+
+def get_fingerprint(model, row: Mapping) -> str:
+    """
+    Get the content fingerprint of a row, an MD5 digest of every column except the fingerprint itself.
+
+    :param model: the model class
+    :param row: dict of column name to value
+    :return: the hex digest fingerprint
+    """
+    values = (normalize(row.get(c.name)) for c in model.__table__.columns if c.name != FINGERPRINT_COLUMN)
+    return hashlib.md5("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def add_fingerprint(model, row: Mapping) -> Dict:
+    """
+    Get a copy of a row with its fingerprint column set, if the model has one.
+
+    :param model: the model class
+    :param row: dict of column name to value
+    :return: dict of column name to value
+    """
+    row = dict(row)
+    if has_fingerprint(model):
+        row[FINGERPRINT_COLUMN] = get_fingerprint(model, row)
+    return row
+
+
+def get_pkey(model, row: Mapping) -> Tuple:
+    """
+    Get the primary key of a row.
+
+    :param model: the model class
+    :param row: dict of column name to value
+    :return: tuple of primary key values, in the order of the primary key constraint
+    """
+    return tuple(row[c.name] for c in model.__table__.primary_key.columns)
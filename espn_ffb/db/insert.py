@@ -1,21 +1,30 @@
 import argparse
 from espn_ffb import util
+from espn_ffb.db import aggregate, bulk, journal, pipeline
 from espn_ffb.db.database import db
 from espn_ffb.db.model.champions import Champions
 from espn_ffb.db.model.matchups import Matchups
+from espn_ffb.db.model.owner_pairs import OwnerPairs
+from espn_ffb.db.model.owner_seasons import OwnerSeasons
 from espn_ffb.db.model.owners import Owners
 from espn_ffb.db.model.records import Records
 from espn_ffb.db.model.sackos import Sackos
+from espn_ffb.db.model.team_weeks import TeamWeeks
 from espn_ffb.db.model.teams import Teams
-from espn_ffb.espn import api
-from espn_ffb.espn.model.league_setting import LeagueSetting
+from espn_ffb.espn import api, cassette, fetch
 from flask import Flask
 import logging
-from sqlalchemy import desc, func
-from typing import Mapping, Sequence
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Iterable, Mapping, Set
 
 app = Flask(__name__)
 
+SHADOW_SCHEMA = "espn_ffb_shadow"
+RETIRED_SCHEMA = "espn_ffb_retired"
+RELOAD_MODELS = (Champions, Matchups, OwnerPairs, OwnerSeasons, Owners, Records, Sackos, TeamWeeks, Teams)
+SWAP_LOCK_TIMEOUT = "10s"
+
 
 def parse_args() -> Mapping:
     """
@@ -25,100 +34,153 @@ def parse_args() -> Mapping:
     parser = argparse.ArgumentParser(description="Create tables and insert into database.")
     parser.add_argument('-e', '--environment', help="The development environment", type=str, required=True,
                         choices=util.SUPPORTED_ENVIRONMENTS)
+    cassette.add_arguments(parser)
     return vars(parser.parse_args())
 
 
-def truncate_tables():
+def truncate_tables(session):
     logging.info("Truncating tables")
-    db.session.query(Champions).delete()
-    db.session.query(Matchups).delete()
-    db.session.query(Owners).delete()
-    db.session.query(Records).delete()
-    db.session.query(Sackos).delete()
-    db.session.query(Teams).delete()
-    db.session.commit()
+    for model in RELOAD_MODELS:
+        session.query(model).delete()
+    session.commit()
 
 
-def insert_owners(league_settings: Sequence[LeagueSetting]):
+def reload(seasons: Iterable[pipeline.SeasonRows]):
     """
-    Insert owners for the given league settings.
+    Replace all league data with the given seasons.
+
+    On PostgreSQL the data is loaded into tables in a shadow schema, which are swapped with the live tables in a single
+    short transaction once they are complete, indexed and analyzed, so readers keep seeing the old data until then.
+    Other dialects truncate the live tables and insert into them. Once the new data is live, a reload entry for every
+    table and league is appended to the change journal.
 
-    :param league_settings: list of league settings
+    :param seasons: the rows of every season, e.g. streamed by pipeline.stream_seasons
     :return: None
     """
-    logging.info("Inserting owners")
-    owners = api.get_owners(league_settings)
-    db.session.bulk_save_objects(owners.values())
-    db.session.commit()
-
-
-def insert_records_and_teams(league_settings: Sequence[LeagueSetting]):
+    if db.engine.dialect.name != "postgresql":
+        # without a shadow schema, finish fetching before truncating, so a failed fetch leaves the existing data
+        seasons = list(seasons)
+        truncate_tables(db.session)
+        league_ids = insert_all(db.session, seasons)
+        insert_reload_changes(db.session, league_ids)
+        return
+
+    # pin a single connection, since the search path below is per connection
+    connection = db.engine.connect()
+    session = Session(bind=connection)
+    try:
+        live_schema = session.execute(text("SELECT current_schema()")).scalar()
+        create_shadow_tables(session)
+        session.execute(text(f"SET search_path TO {SHADOW_SCHEMA}, {live_schema}"))
+        session.commit()
+
+        league_ids = insert_all(session, seasons)
+        swap_shadow_tables(session, live_schema)
+    finally:
+        session.close()
+        # never return the connection with the shadow search path to the pool
+        connection.invalidate()
+        connection.close()
+
+    insert_reload_changes(db.session, league_ids)
+
+
+def create_shadow_tables(session):
     """
-    Insert records and teams for the given league settings.
+    Recreate the shadow schema with empty tables, constraints and indexes.
 
-    :param league_settings: list of league settings
+    :param session: the database session
     :return: None
     """
-    logging.info("Inserting records and teams")
-    records, teams = api.get_records_and_teams(league_settings)
-    db.session.bulk_save_objects(records)
-    db.session.bulk_save_objects(teams)
-    db.session.commit()
+    logging.info(f"Creating shadow tables in {SHADOW_SCHEMA}")
+    session.execute(text(f"DROP SCHEMA IF EXISTS {SHADOW_SCHEMA} CASCADE"))
+    session.execute(text(f"CREATE SCHEMA {SHADOW_SCHEMA}"))
+    session.commit()
 
+    shadow_connection = session.connection().execution_options(schema_translate_map={None: SHADOW_SCHEMA})
+    db.metadata.create_all(bind=shadow_connection, tables=[model.__table__ for model in RELOAD_MODELS])
+    session.commit()
 
-def insert_matchups(league_settings: Sequence[LeagueSetting]):
+
+def swap_shadow_tables(session, live_schema: str):
     """
-    Insert matchups for the given years.
+    Atomically replace the live tables with the loaded shadow tables and drop the old ones.
 
-    :param league_settings: list of league settings
+    :param session: the database session
+    :param live_schema: the schema of the live tables
     :return: None
     """
-    logging.info("Inserting matchups")
-    matchups = api.get_matchups(league_settings)
-    db.session.bulk_save_objects(matchups)
-    db.session.commit()
+    tables = [model.__table__.name for model in RELOAD_MODELS]
+    for table in tables:
+        session.execute(text(f"ANALYZE {SHADOW_SCHEMA}.{table}"))
+    session.execute(text(f"DROP SCHEMA IF EXISTS {RETIRED_SCHEMA} CASCADE"))
+    session.execute(text(f"CREATE SCHEMA {RETIRED_SCHEMA}"))
+    session.commit()
+
+    logging.info(f"Swapping {len(tables)} shadow tables into {live_schema}")
+    session.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+    for table in tables:
+        session.execute(text(f"ALTER TABLE IF EXISTS {live_schema}.{table} SET SCHEMA {RETIRED_SCHEMA}"))
+        session.execute(text(f"ALTER TABLE {SHADOW_SCHEMA}.{table} SET SCHEMA {live_schema}"))
+    session.commit()
+
+    session.execute(text(f"DROP SCHEMA {RETIRED_SCHEMA} CASCADE"))
+    session.execute(text(f"DROP SCHEMA {SHADOW_SCHEMA} CASCADE"))
+    session.commit()
+
+
+def insert_reload_changes(session, league_ids: Iterable[int]):
+    """
+    Append a reload entry for every reloaded table and league to the change journal.
 
+    :param session: the database session
+    :param league_ids: the reloaded league IDs
+    :return: None
+    """
+    journal.record_reload(session, RELOAD_MODELS, league_ids)
+    session.commit()
 
-def insert_champions():
+
+def insert_all(session, seasons: Iterable[pipeline.SeasonRows]) -> Set[int]:
     """
-    Insert championships.
+    Insert all league data for the given seasons into empty tables, committing one season at a time.
 
-    :return: None
+    :param session: the database session
+    :param seasons: the rows of every season
+    :return: set of inserted league IDs
     """
-    logging.info("Inserting champions")
-    champions = get_champions()
-    db.session.bulk_save_objects(champions)
-    db.session.commit()
+    league_ids = set()
+    for season in seasons:
+        insert_season(session, season)
+        league_ids.add(season.league_id)
+    insert_aggregates(session)
+    return league_ids
 
 
-def get_champions():
+def insert_season(session, season: pipeline.SeasonRows):
     """
-    Select championships.
+    Insert the owners, records, teams, matchups, champion and sacko of a season.
 
-    :return: list of championships
+    :param session: the database session
+    :param season: the rows of the season
+    :return: None
     """
-    subquery = db.session.query(Matchups, func.row_number().over(
-        partition_by=Matchups.year,
-        order_by=desc(Matchups.matchup_id)
-    ).label("row_number"))
-    subquery = subquery.filter(Matchups.is_playoffs.is_(True)).subquery()
-    matchups = db.session.query(subquery).filter(subquery.c.row_number == 1).all()
+    logging.info(f"Inserting league {season.league_id} season {season.year}")
+    for model, rows in season.tables:
+        bulk.load(session, model, rows)
+    session.commit()
 
-    champions = list()
-    for m in matchups:
-        if m.is_win:
-            champions.append(Champions(year=m.year, owner_id=m.owner_id))
-        else:
-            champions.append(Champions(year=m.year, owner_id=m.opponent_owner_id))
-    return champions
 
+def insert_aggregates(session):
+    """
+    Insert owner-season and owner pair totals derived from the inserted records and matchups.
 
-def insert_sackos():
-    logging.info("Inserting sackos")
-    sackos = list()
-    # sackos.append(Sackos(year=2018, owner_id="{some_owner_id}"))
-    db.session.bulk_save_objects(sackos)
-    db.session.commit()
+    :param session: the database session
+    :return: None
+    """
+    logging.info("Inserting aggregates")
+    aggregate.refresh_all(session)
+    session.commit()
 
 
 def main():
@@ -131,16 +193,23 @@ def main():
     app.config['SQLALCHEMY_DATABASE_URI'] = app.config.get("DB_URI")
     db.init_app(app)
 
-    with app.app_context():
-        truncate_tables()
-
-        years = api.get_league_years(config)
-        league_settings = api.get_league_settings(config, years)
-        insert_owners(league_settings)
-        insert_records_and_teams(league_settings)
-        insert_matchups(league_settings)
-        insert_champions()
-        insert_sackos()
+    recording = cassette.Cassette.from_args(args)
+    if recording:
+        fetch.set_fetcher(fetch.Fetcher.from_config(config, cassette=recording))
+
+    try:
+        with app.app_context():
+            fetcher = fetch.get_fetcher(config)
+            seasons = pipeline.stream_seasons(config, fetcher, api.get_all_league_years(config, fetcher=fetcher),
+                                              queue_size=config.PIPELINE_QUEUE_SIZE)
+            try:
+                reload(seasons)
+            finally:
+                seasons.close()
+            logging.info(f"ESPN fetch stats: {fetcher.stats}")
+    finally:
+        if recording:
+            recording.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+from datetime import datetime
+from espn_ffb.db.model.changes import Changes
+import json
+from sqlalchemy import text
+from typing import Iterable, Mapping, Sequence, Tuple
+
+INSERT = "insert"
+UPDATE = "update"
+# every row of the table may have changed, e.g. after a full reload
+RELOAD = "reload"
+# every row matching the key may have changed, e.g. the aggregates of a season after a sync
+REFRESH = "refresh"
+
+# serializes journal writers, so versions become visible in commit order and a reader never skips one
+JOURNAL_LOCK_ID = 0x65737066
+
+
+def lock(session):
+    """
+    Hold the journal lock until the end of the transaction, on PostgreSQL.
+
+    :param session: the database session
+    :return: None
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(:id)"), dict(id=JOURNAL_LOCK_ID))
+
+
+def record(session, model, changes: Iterable[Tuple[Sequence, str]]) -> int:
+    """
+    Append row changes to the change journal. The caller commits, so the entries are written in the same transaction
+    as the rows.
+
+    :param session: the database session
+    :param model: the model class, with a league_id primary key column
+    :param changes: (primary key tuple, operation) tuples
+    :return: the number of journal entries
+    """
+    names = [c.name for c in model.__table__.primary_key.columns]
+    changed_at = datetime.utcnow()
+    entries = list()
+    for pkey, operation in changes:
+        key = dict(zip(names, pkey))
+        entries.append(dict(league_id=key["league_id"], table_name=model.__tablename__,
+                            row_key=json.dumps(key, default=str, sort_keys=True), operation=operation,
+                            changed_at=changed_at))
+    if entries:
+        lock(session)
+        session.execute(Changes.__table__.insert(), entries)
+    return len(entries)
+
+
+def record_refresh(session, model, keys: Iterable[Mapping]) -> int:
+    """
+    Append a refresh entry for every key, telling consumers to refresh the rows they hold that match it. The caller
+    commits, so the entries are written in the same transaction as the rows.
+
+    :param session: the database session
+    :param model: the model class, with a league_id primary key column
+    :param keys: dicts of leading primary key column name to value, each with a league_id
+    :return: the number of journal entries
+    """
+    changed_at = datetime.utcnow()
+    entries = [dict(league_id=key["league_id"], table_name=model.__tablename__,
+                    row_key=json.dumps(key, default=str, sort_keys=True), operation=REFRESH, changed_at=changed_at)
+               for key in keys]
+    if entries:
+        lock(session)
+        session.execute(Changes.__table__.insert(), entries)
+    return len(entries)
+
+
+def record_reload(session, models: Iterable, league_ids: Iterable[int]) -> int:
+    """
+    Append a reload entry for every table and league, telling consumers to refresh everything they hold of it.
+
+    :param session: the database session
+    :param models: the reloaded model classes
+    :param league_ids: the reloaded league IDs
+    :return: the number of journal entries
+    """
+    changed_at = datetime.utcnow()
+    entries = [dict(league_id=league_id, table_name=model.__tablename__, row_key=None, operation=RELOAD,
+                    changed_at=changed_at)
+               for league_id in sorted(set(league_ids)) for model in models]
+    if entries:
+        lock(session)
+        session.execute(Changes.__table__.insert(), entries)
+    return len(entries)
+
+
+def to_json(change: Changes) -> Mapping:
+    return dict(
+        version=change.version,
+        league_id=change.league_id,
+        table=change.table_name,
+        key=json.loads(change.row_key) if change.row_key else None,
+        operation=change.operation,
+        changed_at=change.changed_at.isoformat(),
+    )
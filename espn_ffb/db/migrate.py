@@ -0,0 +1,358 @@
+import argparse
+from datetime import datetime
+from espn_ffb import util
+from espn_ffb.db import aggregate
+from espn_ffb.db.database import db
+from espn_ffb.db.model.changes import Changes
+from espn_ffb.db.model.owner_pairs import OwnerPairs
+from espn_ffb.db.model.owner_seasons import OwnerSeasons
+from espn_ffb.db.model.schema_migrations import SchemaMigrations
+from espn_ffb.db.model.sync_state import SyncState
+from espn_ffb.db.model.team_weeks import TeamWeeks
+from espn_ffb.db.query import Query
+from flask import Flask, current_app
+import json
+import logging
+from sqlalchemy import event, func, text
+from typing import Callable, List, Mapping, NamedTuple, Optional, Sequence, Set, Union
+
+app = Flask(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    # SQL statements, or functions of the session for data migrations
+    statements: Sequence[Union[str, Callable]]
+
+
+# the primary key name and columns of every table before it was keyed by league, pinned for migration 1
+LEAGUE_KEYED_TABLES = (
+    ("champions", "champions_league_id_year_pkey", ("year",)),
+    ("matchups", "matchups_league_id_year_matchup_id_team_id_pkey", ("year", "matchup_id", "team_id")),
+    ("owners", "owners_league_id_username_pkey", ("username",)),
+    ("records", "records_league_id_year_team_id_pkey", ("year", "team_id")),
+    ("sackos", "sackos_league_id_year_pkey", ("year",)),
+    ("teams", "teams_league_id_year_id_pkey", ("year", "id")),
+)
+
+
+def add_league_ids(session):
+    """
+    Key the tables of a database created before multiple league support by league, for migration 1.
+
+    Every table without a league_id column gets one, backfilled with the configured LEAGUE_ID, the only league such a
+    database can hold, and its primary key is rebuilt with league_id first. Tables that already have the column, e.g.
+    in a database created after multiple league support but before migrations, are left alone.
+
+    :param session: the database session
+    :return: None
+    """
+    league_id = int(current_app.config.get("LEAGUE_ID"))
+    for table, pkey_name, columns in LEAGUE_KEYED_TABLES:
+        has_league_id = session.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = 'league_id'"),
+            dict(table=table)).scalar()
+        if has_league_id:
+            continue
+
+        logging.info(f"Keying {table} by league {league_id}")
+        old_pkey_name = session.execute(text(
+            "SELECT constraint_name FROM information_schema.table_constraints "
+            "WHERE table_schema = current_schema() AND table_name = :table AND constraint_type = 'PRIMARY KEY'"),
+            dict(table=table)).scalar()
+        session.execute(text(f"ALTER TABLE {table} ADD COLUMN league_id integer NOT NULL DEFAULT {league_id}"))
+        session.execute(text(f"ALTER TABLE {table} ALTER COLUMN league_id DROP DEFAULT"))
+        if old_pkey_name:
+            session.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{old_pkey_name}"'))
+        session.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {pkey_name} "
+                             f"PRIMARY KEY (league_id, {', '.join(columns)})"))
+
+
+def refresh_owner_aggregates(session):
+    """
+    Backfill the owner-season and owner pair aggregates, for migration 6.
+
+    Released migrations must not depend on tables added later, so this only refreshes the tables migration 6 creates
+    instead of calling aggregate.refresh_all.
+
+    :param session: the database session
+    :return: None
+    """
+    for league_id, years in aggregate.get_all_league_years(session).items():
+        aggregate.refresh_owner_seasons(session, league_id, years)
+        aggregate.refresh_owner_pairs(session, league_id, aggregate.get_owner_ids(session, league_id, years))
+
+
+def refresh_team_weeks(session):
+    """
+    Backfill the team-week snapshots, for migration 8.
+
+    :param session: the database session
+    :return: None
+    """
+    for league_id, years in aggregate.get_all_league_years(session).items():
+        aggregate.refresh_team_weeks(session, league_id, years)
+
+
+class PlanCheck(NamedTuple):
+    name: str
+    expected_index: str
+    used_indexes: Set[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.expected_index in self.used_indexes
+
+
+# ordered schema steps, never edit or reorder a released migration, append a new one instead
+MIGRATIONS = [
+    Migration(1, "Key tables by league and add sync state", [
+        add_league_ids,
+        "CREATE TABLE IF NOT EXISTS sync_state ("
+        "name varchar NOT NULL, watermark varchar NOT NULL, updated_at timestamp without time zone NOT NULL, "
+        f"CONSTRAINT {SyncState.PKEY_NAME} PRIMARY KEY (name))",
+    ]),
+    Migration(2, "Add row fingerprints", [
+        "ALTER TABLE matchups ADD COLUMN IF NOT EXISTS fingerprint varchar(32)",
+        "ALTER TABLE records ADD COLUMN IF NOT EXISTS fingerprint varchar(32)",
+        "ALTER TABLE teams ADD COLUMN IF NOT EXISTS fingerprint varchar(32)",
+    ]),
+    Migration(3, "Index matchups by owner and opponent", [
+        "CREATE INDEX IF NOT EXISTS matchups_league_id_owner_id_is_playoffs_opponent_owner_id_idx "
+        "ON matchups (league_id, owner_id, is_playoffs, opponent_owner_id) "
+        "WHERE NOT is_pending AND NOT is_consolation",
+    ]),
+    Migration(4, "Index playoff matchups", [
+        "CREATE INDEX IF NOT EXISTS matchups_league_id_year_playoffs_idx "
+        "ON matchups (league_id, year) WHERE is_playoffs AND opponent_owner_id IS NOT NULL",
+    ]),
+    Migration(5, "Index owners by ID", [
+        "CREATE INDEX IF NOT EXISTS owners_league_id_id_idx ON owners (league_id, id)",
+    ]),
+    Migration(6, "Add owner-season and owner pair aggregates", [
+        "CREATE TABLE IF NOT EXISTS owner_seasons ("
+        "league_id integer NOT NULL, year integer NOT NULL, owner_id varchar NOT NULL, "
+        "wins integer NOT NULL, losses integer NOT NULL, ties integer NOT NULL, "
+        "points_for numeric NOT NULL, points_against numeric NOT NULL, playoff_games integer NOT NULL, "
+        "playoff_wins integer NOT NULL, playoff_losses integer NOT NULL, playoff_ties integer NOT NULL, "
+        "playoff_points_for numeric NOT NULL, playoff_points_against numeric NOT NULL, "
+        f"CONSTRAINT {OwnerSeasons.PKEY_NAME} PRIMARY KEY (league_id, year, owner_id))",
+        "CREATE TABLE IF NOT EXISTS owner_pairs ("
+        "league_id integer NOT NULL, owner_id varchar NOT NULL, opponent_owner_id varchar NOT NULL, "
+        "is_playoffs boolean NOT NULL, wins integer NOT NULL, losses integer NOT NULL, "
+        f"CONSTRAINT {OwnerPairs.PKEY_NAME} PRIMARY KEY (league_id, owner_id, opponent_owner_id, is_playoffs))",
+        refresh_owner_aggregates,
+    ]),
+    Migration(7, "Add change journal", [
+        "CREATE TABLE IF NOT EXISTS changes ("
+        "version bigserial NOT NULL, league_id integer NOT NULL, table_name varchar NOT NULL, row_key varchar, "
+        "operation varchar NOT NULL, changed_at timestamp without time zone NOT NULL, "
+        f"CONSTRAINT {Changes.PKEY_NAME} PRIMARY KEY (version))",
+        "CREATE INDEX IF NOT EXISTS changes_league_id_version_idx ON changes (league_id, version)",
+    ]),
+    Migration(8, "Add team-week snapshots", [
+        "CREATE TABLE IF NOT EXISTS team_weeks ("
+        "league_id integer NOT NULL, year integer NOT NULL, matchup_id integer NOT NULL, team_id integer NOT NULL, "
+        "wins integer NOT NULL, losses integer NOT NULL, ties integer NOT NULL, "
+        "points_for numeric NOT NULL, points_against numeric NOT NULL, "
+        f"CONSTRAINT {TeamWeeks.PKEY_NAME} PRIMARY KEY (league_id, year, matchup_id, team_id))",
+        refresh_team_weeks,
+    ]),
+]
+
+
+def parse_args() -> Mapping:
+    """
+
+    :return: dict of parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations in place.")
+    parser.add_argument('-e', '--environment', help="The development environment", type=str, required=True,
+                        choices=util.SUPPORTED_ENVIRONMENTS)
+    parser.add_argument('command', help="The migration command", type=str, choices={"status", "upgrade", "check"})
+    parser.add_argument('--to', help="The version to upgrade to, defaults to the latest", type=int)
+    return vars(parser.parse_args())
+
+
+def get_latest_version() -> int:
+    return MIGRATIONS[-1].version
+
+
+def get_current_version(session) -> int:
+    """
+    Get the version of the most recently applied migration.
+
+    :param session: the database session
+    :return: the version, or 0 if no migration was applied
+    """
+    SchemaMigrations.__table__.create(bind=session.connection(), checkfirst=True)
+    return session.query(func.coalesce(func.max(SchemaMigrations.version), 0)).scalar()
+
+
+def upgrade(session, target: Optional[int] = None) -> List[Migration]:
+    """
+    Apply every pending migration up to the target version, each in its own transaction.
+
+    :param session: the database session
+    :param target: the version to upgrade to, defaults to the latest
+    :return: list of applied migrations
+    """
+    target = target or get_latest_version()
+    current = get_current_version(session)
+    session.commit()
+
+    applied = list()
+    for migration in MIGRATIONS:
+        if migration.version <= current or migration.version > target:
+            continue
+
+        logging.info(f"Applying migration {migration.version}: {migration.description}")
+        for statement in migration.statements:
+            if callable(statement):
+                statement(session)
+            else:
+                session.execute(text(statement))
+        session.add(SchemaMigrations(version=migration.version, description=migration.description,
+                                     applied_at=datetime.utcnow()))
+        session.commit()
+        applied.append(migration)
+
+    return applied
+
+
+def stamp(session, version: Optional[int] = None):
+    """
+    Record every migration up to the version as applied without running it, e.g. after create_all.
+
+    :param session: the database session
+    :param version: the version, defaults to the latest
+    :return: None
+    """
+    version = version or get_latest_version()
+    current = get_current_version(session)
+    for migration in MIGRATIONS:
+        if current < migration.version <= version:
+            session.add(SchemaMigrations(version=migration.version, description=migration.description,
+                                         applied_at=datetime.utcnow()))
+    session.commit()
+
+
+def get_hot_queries(query: Query) -> Sequence[Mapping]:
+    """
+    Get the hot read queries, each with the index it is expected to use, run against sample data.
+
+    :param query: the query object
+    :return: list of dicts with the query name, expected index and a function that runs it
+    """
+    owners = query.get_owners()
+    owner_id = owners[0].id if owners else ""
+    opponent_owner_id = owners[-1].id if owners else ""
+    years = query.get_distinct_years()
+    year = years[0] if years else 0
+
+    h2h_index = "matchups_league_id_owner_id_is_playoffs_opponent_owner_id_idx"
+    return [
+        dict(name="get_matchup_history", expected_index=h2h_index,
+             run=lambda: query.get_matchup_history(owner_id, opponent_owner_id, False)),
+        dict(name="get_h2h_records", expected_index=OwnerPairs.PKEY_NAME,
+             run=lambda: query.get_h2h_records(owner_id, False)),
+        dict(name="get_owner_seasons", expected_index=OwnerSeasons.PKEY_NAME,
+             run=lambda: query.get_owner_seasons(year)),
+        dict(name="get_team_weeks", expected_index=TeamWeeks.PKEY_NAME,
+             run=lambda: query.get_team_weeks(year, 1)),
+        dict(name="get_playoff_matchups", expected_index="matchups_league_id_year_playoffs_idx",
+             run=lambda: query.get_playoff_matchups(year)),
+    ]
+
+
+def capture_statements(fn: Callable) -> List[tuple]:
+    """
+    Run a function and capture the SQL statements it executes.
+
+    :param fn: the function
+    :return: list of (statement, parameters) tuples
+    """
+    statements = list()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def get_plan_indexes(plan: Mapping) -> Set[str]:
+    indexes = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        indexes |= get_plan_indexes(child)
+    return indexes
+
+
+def check(query: Query) -> List[PlanCheck]:
+    """
+    EXPLAIN every hot query and check that its plan uses the expected index.
+
+    Sequential scans are disabled while explaining, so the check holds on small tables where the planner would
+    otherwise prefer a sequential scan.
+
+    :param query: the query object
+    :return: list of plan checks
+    """
+    checks = list()
+    for hot_query in get_hot_queries(query):
+        used_indexes = set()
+        for statement, parameters in capture_statements(hot_query["run"]):
+            cursor = db.session.connection().connection.cursor()
+            try:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                plan = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            used_indexes |= get_plan_indexes(plan[0]["Plan"])
+        checks.append(PlanCheck(hot_query["name"], hot_query["expected_index"], used_indexes))
+    db.session.rollback()
+    return checks
+
+
+def main():
+    args = parse_args()
+    environment = args.get("environment")
+    config = util.get_config(environment)
+    app.config.from_object(config)
+    util.set_logger(config=config, filename=__file__)
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_DATABASE_URI'] = app.config.get("DB_URI")
+    db.init_app(app)
+
+    with app.app_context():
+        command = args.get("command")
+        if command == "status":
+            current = get_current_version(db.session)
+            db.session.commit()
+            for migration in MIGRATIONS:
+                state = "applied" if migration.version <= current else "pending"
+                print(f"{migration.version:>4}  {state:<8}  {migration.description}")
+        elif command == "upgrade":
+            applied = upgrade(db.session, target=args.get("to"))
+            print(f"Applied {len(applied)} migrations, now at version {get_current_version(db.session)}")
+        elif command == "check":
+            checks = check(Query(db, league_id=config.LEAGUE_ID))
+            for c in checks:
+                print(f"{'ok' if c.ok else 'MISSING':<8}  {c.name}  expected {c.expected_index}, "
+                      f"used {', '.join(sorted(c.used_indexes)) or 'no index'}")
+            if not all(c.ok for c in checks):
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,12 @@ from espn_ffb.db.database import db
 
 
 class Champions(db.Model):
-    PKEY_NAME = "champions_year_pkey"
+    PKEY_NAME = "champions_league_id_year_pkey"
 
+    league_id = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
     owner_id = db.Column(db.String, nullable=False)
-    db.PrimaryKeyConstraint(year, name=PKEY_NAME)
+    db.PrimaryKeyConstraint(league_id, year, name=PKEY_NAME)
 
     def __str__(self):
         return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
@@ -16,6 +17,7 @@ class Champions(db.Model):
 
     def __key(self):
         return (
+            self.league_id,
             self.year,
             self.owner_id
         )
@@ -28,6 +30,7 @@ class Champions(db.Model):
 
     def as_dict(self):
         return {
+            'league_id': self.league_id,
             'year': self.year,
             'owner_id': self.owner_id
         }
@@ -0,0 +1,51 @@
+from espn_ffb.db.database import db
+
+
+class Changes(db.Model):
+    PKEY_NAME = "changes_version_pkey"
+
+    # SQLite only autoincrements an INTEGER primary key
+    version = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), autoincrement=True, nullable=False)
+    league_id = db.Column(db.Integer, nullable=False)
+    table_name = db.Column(db.String, nullable=False)
+    row_key = db.Column(db.String)
+    operation = db.Column(db.String, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)
+    db.PrimaryKeyConstraint(version, name=PKEY_NAME)
+    # change feed of a league
+    db.Index("changes_league_id_version_idx", league_id, version)
+
+    def __str__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __repr__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __key(self):
+        return (
+            self.version,
+            self.league_id,
+            self.table_name,
+            self.row_key,
+            self.operation,
+            self.changed_at
+        )
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __eq__(self, other):
+        return isinstance(self, type(other)) and self.__key() == other.__key()
+
+    def as_dict(self):
+        return {
+            'version': self.version,
+            'league_id': self.league_id,
+            'table_name': self.table_name,
+            'row_key': self.row_key,
+            'operation': self.operation,
+            'changed_at': self.changed_at
+        }
+
+    def props_dict(self):
+        return self.as_dict()
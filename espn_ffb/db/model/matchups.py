@@ -2,8 +2,9 @@ from espn_ffb.db.database import db
 
 
 class Matchups(db.Model):
-    PKEY_NAME = "matchups_year_matchup_id_team_id_pkey"
+    PKEY_NAME = "matchups_league_id_year_matchup_id_team_id_pkey"
 
+    league_id = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
     matchup_id = db.Column(db.Integer, nullable=False)
     team_id = db.Column(db.Integer, nullable=False)
@@ -18,7 +19,15 @@ class Matchups(db.Model):
     is_bye = db.Column(db.Boolean, nullable=False)
     is_playoffs = db.Column(db.Boolean, nullable=False)
     is_consolation = db.Column(db.Boolean, nullable=False)
-    db.PrimaryKeyConstraint(year, matchup_id, team_id, name=PKEY_NAME)
+    fingerprint = db.Column(db.String(32))
+    db.PrimaryKeyConstraint(league_id, year, matchup_id, team_id, name=PKEY_NAME)
+    # matchup history and head-to-head records of an owner
+    db.Index("matchups_league_id_owner_id_is_playoffs_opponent_owner_id_idx",
+             league_id, owner_id, is_playoffs, opponent_owner_id,
+             postgresql_where=db.and_(db.not_(is_pending), db.not_(is_consolation)))
+    # playoff standings and champions
+    db.Index("matchups_league_id_year_playoffs_idx", league_id, year,
+             postgresql_where=db.and_(is_playoffs, opponent_owner_id.isnot(None)))
 
     def __str__(self):
         return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
@@ -28,6 +37,7 @@ class Matchups(db.Model):
 
     def __key(self):
         return (
+            self.league_id,
             self.year,
             self.matchup_id,
             self.team_id,
@@ -52,6 +62,7 @@ class Matchups(db.Model):
 
     def as_dict(self):
         return {
+            'league_id': self.league_id,
             'year': self.year,
             'matchup_id': self.matchup_id,
             'team_id': self.team_id,
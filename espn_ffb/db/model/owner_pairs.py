@@ -0,0 +1,48 @@
+from espn_ffb.db.database import db
+
+
+class OwnerPairs(db.Model):
+    PKEY_NAME = "owner_pairs_pkey"
+
+    league_id = db.Column(db.Integer, nullable=False)
+    owner_id = db.Column(db.String, nullable=False)
+    opponent_owner_id = db.Column(db.String, nullable=False)
+    is_playoffs = db.Column(db.Boolean, nullable=False)
+    wins = db.Column(db.Integer, nullable=False)
+    losses = db.Column(db.Integer, nullable=False)
+    db.PrimaryKeyConstraint(league_id, owner_id, opponent_owner_id, is_playoffs, name=PKEY_NAME)
+
+    def __str__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __repr__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __key(self):
+        return (
+            self.league_id,
+            self.owner_id,
+            self.opponent_owner_id,
+            self.is_playoffs,
+            self.wins,
+            self.losses
+        )
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __eq__(self, other):
+        return isinstance(self, type(other)) and self.__key() == other.__key()
+
+    def as_dict(self):
+        return {
+            'league_id': self.league_id,
+            'owner_id': self.owner_id,
+            'opponent_owner_id': self.opponent_owner_id,
+            'is_playoffs': self.is_playoffs,
+            'wins': self.wins,
+            'losses': self.losses
+        }
+
+    def props_dict(self):
+        return self.as_dict()
@@ -0,0 +1,72 @@
+from espn_ffb.db.database import db
+
+
+class OwnerSeasons(db.Model):
+    PKEY_NAME = "owner_seasons_league_id_year_owner_id_pkey"
+
+    league_id = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    owner_id = db.Column(db.String, nullable=False)
+    wins = db.Column(db.Integer, nullable=False)
+    losses = db.Column(db.Integer, nullable=False)
+    ties = db.Column(db.Integer, nullable=False)
+    points_for = db.Column(db.Numeric, nullable=False)
+    points_against = db.Column(db.Numeric, nullable=False)
+    playoff_games = db.Column(db.Integer, nullable=False)
+    playoff_wins = db.Column(db.Integer, nullable=False)
+    playoff_losses = db.Column(db.Integer, nullable=False)
+    playoff_ties = db.Column(db.Integer, nullable=False)
+    playoff_points_for = db.Column(db.Numeric, nullable=False)
+    playoff_points_against = db.Column(db.Numeric, nullable=False)
+    db.PrimaryKeyConstraint(league_id, year, owner_id, name=PKEY_NAME)
+
+    def __str__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __repr__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __key(self):
+        return (
+            self.league_id,
+            self.year,
+            self.owner_id,
+            self.wins,
+            self.losses,
+            self.ties,
+            self.points_for,
+            self.points_against,
+            self.playoff_games,
+            self.playoff_wins,
+            self.playoff_losses,
+            self.playoff_ties,
+            self.playoff_points_for,
+            self.playoff_points_against
+        )
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __eq__(self, other):
+        return isinstance(self, type(other)) and self.__key() == other.__key()
+
+    def as_dict(self):
+        return {
+            'league_id': self.league_id,
+            'year': self.year,
+            'owner_id': self.owner_id,
+            'wins': self.wins,
+            'losses': self.losses,
+            'ties': self.ties,
+            'points_for': self.points_for,
+            'points_against': self.points_against,
+            'playoff_games': self.playoff_games,
+            'playoff_wins': self.playoff_wins,
+            'playoff_losses': self.playoff_losses,
+            'playoff_ties': self.playoff_ties,
+            'playoff_points_for': self.playoff_points_for,
+            'playoff_points_against': self.playoff_points_against
+        }
+
+    def props_dict(self):
+        return self.as_dict()
@@ -2,16 +2,19 @@ from espn_ffb.db.database import db
 
 
 class Owners(db.Model):
-    PKEY_NAME = "owners_username_pkey"
+    PKEY_NAME = "owners_league_id_username_pkey"
 
+    league_id = db.Column(db.Integer, nullable=False)
     id = db.Column(db.String, nullable=False)
     username = db.Column(db.String, nullable=False)
     first_name = db.Column(db.String, nullable=False)
     last_name = db.Column(db.String, nullable=False)
-    db.PrimaryKeyConstraint(username, name=PKEY_NAME)
+    db.PrimaryKeyConstraint(league_id, username, name=PKEY_NAME)
+    db.Index("owners_league_id_id_idx", league_id, id)
 
     def __key(self):
         return (
+            self.league_id,
             self.id,
             self.username,
             self.first_name,
@@ -26,6 +29,7 @@ class Owners(db.Model):
 
     def as_dict(self):
         return {
+            'league_id': self.league_id,
             'id': self.id,
             'username': self.username,
             'first_name': self.first_name,
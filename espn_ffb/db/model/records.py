@@ -2,8 +2,9 @@ from espn_ffb.db.database import db
 
 
 class Records(db.Model):
-    PKEY_NAME = "records_year_team_id_pkey"
+    PKEY_NAME = "records_league_id_year_team_id_pkey"
 
+    league_id = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
     team_id = db.Column(db.Integer, nullable=False)
     owner_id = db.Column(db.String, nullable=False)
@@ -15,7 +16,8 @@ class Records(db.Model):
     points_against = db.Column(db.Numeric, nullable=False)
     streak_length = db.Column(db.Integer, nullable=False)
     streak_type = db.Column(db.String, nullable=False)
-    db.PrimaryKeyConstraint(year, team_id, name=PKEY_NAME)
+    fingerprint = db.Column(db.String(32))
+    db.PrimaryKeyConstraint(league_id, year, team_id, name=PKEY_NAME)
 
     def __str__(self):
         return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
@@ -25,6 +27,7 @@ class Records(db.Model):
 
     def __key(self):
         return (
+            self.league_id,
             self.year,
             self.team_id,
             self.owner_id,
@@ -46,6 +49,7 @@ class Records(db.Model):
 
     def as_dict(self):
         return {
+            'league_id': self.league_id,
             'year': self.year,
             'team_id': self.team_id,
             'owner_id': self.owner_id,
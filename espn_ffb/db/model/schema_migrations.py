@@ -0,0 +1,16 @@
+from espn_ffb.db.database import db
+
+
+class SchemaMigrations(db.Model):
+    PKEY_NAME = "schema_migrations_version_pkey"
+
+    version = db.Column(db.Integer, nullable=False)
+    description = db.Column(db.String, nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False)
+    db.PrimaryKeyConstraint(version, name=PKEY_NAME)
+
+    def __str__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __repr__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
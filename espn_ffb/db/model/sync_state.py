@@ -0,0 +1,39 @@
+from espn_ffb.db.database import db
+
+
+class SyncState(db.Model):
+    PKEY_NAME = "sync_state_name_pkey"
+
+    name = db.Column(db.String, nullable=False)
+    watermark = db.Column(db.String, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    db.PrimaryKeyConstraint(name, name=PKEY_NAME)
+
+    def __str__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __repr__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __key(self):
+        return (
+            self.name,
+            self.watermark,
+            self.updated_at
+        )
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __eq__(self, other):
+        return isinstance(self, type(other)) and self.__key() == other.__key()
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'watermark': self.watermark,
+            'updated_at': self.updated_at
+        }
+
+    def props_dict(self):
+        return self.as_dict()
@@ -0,0 +1,57 @@
+from espn_ffb.db.database import db
+
+
+class TeamWeeks(db.Model):
+    PKEY_NAME = "team_weeks_league_id_year_matchup_id_team_id_pkey"
+
+    league_id = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    matchup_id = db.Column(db.Integer, nullable=False)
+    team_id = db.Column(db.Integer, nullable=False)
+    wins = db.Column(db.Integer, nullable=False)
+    losses = db.Column(db.Integer, nullable=False)
+    ties = db.Column(db.Integer, nullable=False)
+    points_for = db.Column(db.Numeric, nullable=False)
+    points_against = db.Column(db.Numeric, nullable=False)
+    db.PrimaryKeyConstraint(league_id, year, matchup_id, team_id, name=PKEY_NAME)
+
+    def __str__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __repr__(self):
+        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
+
+    def __key(self):
+        return (
+            self.league_id,
+            self.year,
+            self.matchup_id,
+            self.team_id,
+            self.wins,
+            self.losses,
+            self.ties,
+            self.points_for,
+            self.points_against
+        )
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __eq__(self, other):
+        return isinstance(self, type(other)) and self.__key() == other.__key()
+
+    def as_dict(self):
+        return {
+            'league_id': self.league_id,
+            'year': self.year,
+            'matchup_id': self.matchup_id,
+            'team_id': self.team_id,
+            'wins': self.wins,
+            'losses': self.losses,
+            'ties': self.ties,
+            'points_for': self.points_for,
+            'points_against': self.points_against
+        }
+
+    def props_dict(self):
+        return self.as_dict()
@@ -2,15 +2,17 @@ from espn_ffb.db.database import db
 
 
 class Teams(db.Model):
-    PKEY_NAME = "teams_year_id_pkey"
+    PKEY_NAME = "teams_league_id_year_id_pkey"
 
+    league_id = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
     id = db.Column(db.Integer, nullable=False)
     owner_id = db.Column(db.String, nullable=False)
     abbreviation = db.Column(db.String, nullable=False)
     location = db.Column(db.String, nullable=False)
     nickname = db.Column(db.String, nullable=False)
-    db.PrimaryKeyConstraint(year, id, name=PKEY_NAME)
+    fingerprint = db.Column(db.String(32))
+    db.PrimaryKeyConstraint(league_id, year, id, name=PKEY_NAME)
 
     def __str__(self):
         return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
@@ -20,6 +22,7 @@ class Teams(db.Model):
 
     def __key(self):
         return (
+            self.league_id,
             self.year,
             self.id,
             self.owner_id,
@@ -36,6 +39,7 @@ class Teams(db.Model):
 
     def as_dict(self):
         return {
+            'league_id': self.league_id,
             'year': self.year,
             'id': self.id,
             'owner_id': self.owner_id,
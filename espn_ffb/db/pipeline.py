@@ -0,0 +1,156 @@
+from espn_ffb.config import Config
+from espn_ffb.db.model.champions import Champions
+from espn_ffb.db.model.matchups import Matchups
+from espn_ffb.db.model.owners import Owners
+from espn_ffb.db.model.records import Records
+from espn_ffb.db.model.sackos import Sackos
+from espn_ffb.db.model.teams import Teams
+from espn_ffb.espn import api
+from espn_ffb.espn.fetch import Fetcher
+from espn_ffb.espn.model.league_setting import LeagueSetting
+import logging
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Mapping, NamedTuple, Sequence, Set, Tuple, Type
+
+PIPELINE_QUEUE_SIZE = 2
+# how often a blocked stage checks whether the pipeline was stopped
+POLL_TIMEOUT = 0.5
+
+
+class SeasonRows(NamedTuple):
+    league_id: int
+    year: int
+    # (model, rows) tuples, in load order
+    tables: Sequence[Tuple[Any, List[Mapping]]]
+
+
+class StageError(NamedTuple):
+    exception: BaseException
+
+
+_DONE = object()
+
+
+def put(sink: queue.Queue, item, stop_event: threading.Event) -> bool:
+    """
+    Put an item on a bounded queue, waiting for room unless the pipeline is stopped.
+
+    :param sink: the queue
+    :param item: the item
+    :param stop_event: the event set when the pipeline is stopped
+    :return: True if the item was put, False if the pipeline was stopped first
+    """
+    while not stop_event.is_set():
+        try:
+            sink.put(item, timeout=POLL_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def drain(source: queue.Queue, stop_event: threading.Event) -> Iterator:
+    """
+    Take items from a queue until its stage is done or the pipeline is stopped, raising the stage's exception if it
+    failed.
+
+    :param source: the queue
+    :param stop_event: the event set when the pipeline is stopped
+    :return: generator of items
+    """
+    while not stop_event.is_set():
+        try:
+            item = source.get(timeout=POLL_TIMEOUT)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, StageError):
+            raise item.exception
+        yield item
+
+
+def start_stage(name: str, fn: Callable, items: Iterable, sink: queue.Queue, stop_event: threading.Event):
+    """
+    Start a thread that applies a function to each item and puts the results on a bounded queue.
+
+    :param name: the stage name, used as the thread name
+    :param fn: the function to apply
+    :param items: the items, e.g. drained from the previous stage
+    :param sink: the queue of the next stage
+    :param stop_event: the event set when the pipeline is stopped
+    :return: the started thread
+    """
+    def run():
+        try:
+            for item in items:
+                if not put(sink, fn(item), stop_event):
+                    return
+        except BaseException as e:
+            put(sink, StageError(e), stop_event)
+            return
+        put(sink, _DONE, stop_event)
+
+    thread = threading.Thread(target=run, name=f"ingest-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_season_rows(league_setting: LeagueSetting, seen_owners: Set[Tuple[int, str]]) -> SeasonRows:
+    """
+    Transform the league settings of a season into rows for every table.
+
+    :param league_setting: the league setting
+    :param seen_owners: (league ID, username) of the owners of earlier seasons, updated with this season's owners
+    :return: the season rows
+    """
+    owners = list()
+    for row in api.get_owner_rows([league_setting]):
+        if (row["league_id"], row["username"]) not in seen_owners:
+            seen_owners.add((row["league_id"], row["username"]))
+            owners.append(row)
+
+    league_settings = [league_setting]
+    return SeasonRows(league_id=league_setting.league_id, year=league_setting.season_id, tables=[
+        (Owners, owners),
+        (Records, list(api.get_record_rows(league_settings))),
+        (Teams, list(api.get_team_rows(league_settings))),
+        (Matchups, list(api.get_matchup_rows(league_settings))),
+        (Champions, list(api.get_champion_rows(league_settings))),
+        (Sackos, list(api.get_sacko_rows(league_settings))),
+    ])
+
+
+def stream_seasons(config: Type[Config], fetcher: Fetcher, league_years: Sequence[Tuple[Type[Config], int]],
+                   queue_size: int = PIPELINE_QUEUE_SIZE) -> Iterator[SeasonRows]:
+    """
+    Fetch, parse and transform one season at a time on background threads.
+
+    The stages are connected by bounded queues, so at most a few seasons are held in memory however long the league
+    history is, and the consumer writing one season overlaps with the next seasons being fetched. A failed stage
+    raises its exception in the consumer. Closing the generator stops the stages.
+
+    :param config: the config object
+    :param fetcher: the fetcher
+    :param league_years: list of (league config, year) tuples
+    :param queue_size: the most seasons waiting between two stages
+    :return: generator of season rows, in the same order as the league years
+    """
+    stop_event = threading.Event()
+    fetched, parsed, transformed = (queue.Queue(maxsize=queue_size) for _ in range(3))
+    seen_owners = set()
+
+    logging.info(f"Streaming {len(league_years)} seasons")
+    start_stage("fetch", lambda data: data,
+                fetcher.imap(lambda league_year: api.get_season_league_data(league_year, fetcher), league_years,
+                             window=queue_size),
+                fetched, stop_event)
+    start_stage("parse", lambda data: LeagueSetting(data, keep_data=config.KEEP_RAW_DATA),
+                drain(fetched, stop_event), parsed, stop_event)
+    start_stage("transform", lambda league_setting: get_season_rows(league_setting, seen_owners),
+                drain(parsed, stop_event), transformed, stop_event)
+    try:
+        yield from drain(transformed, stop_event)
+    finally:
+        stop_event.set()
@@ -0,0 +1,112 @@
+import argparse
+from datetime import datetime
+from espn_ffb import util
+from espn_ffb.config import Config
+from espn_ffb.db import update
+from espn_ffb.db.database import db
+from espn_ffb.db.query import Query
+from flask import Flask
+import logging
+import signal
+import threading
+from typing import Mapping, Type
+
+app = Flask(__name__)
+stop_event = threading.Event()
+
+
+def parse_args() -> Mapping:
+    """
+
+    :return: dict of parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Continuously sync matchups, records, and teams")
+    parser.add_argument('-e', '--environment', help="The development environment", type=str, required=True,
+                        choices=util.SUPPORTED_ENVIRONMENTS)
+    parser.add_argument('--full', help="Sync the whole season instead of the recent matchup periods",
+                        action="store_true")
+    return vars(parser.parse_args())
+
+
+def is_game_window(config: Type[Config], now: datetime) -> bool:
+    """
+    Check whether NFL games may be in progress.
+
+    :param config: the config object
+    :param now: the current UTC time
+    :return: True if now falls in one of the configured game windows
+    """
+    return any(weekday == now.weekday() and start_hour <= now.hour < end_hour
+               for weekday, start_hour, end_hour in config.POLL_GAME_WINDOWS)
+
+
+def get_poll_interval(config: Type[Config], now: datetime) -> int:
+    """
+    Get the number of seconds to wait before the next sync.
+
+    :param config: the config object
+    :param now: the current UTC time
+    :return: the poll interval in seconds
+    """
+    if is_game_window(config=config, now=now):
+        return config.POLL_INTERVAL_LIVE
+    return config.POLL_INTERVAL_IDLE
+
+
+def poll(query: Query, config: Type[Config], incremental: bool = True):
+    """
+    Sync until stopped, polling faster while games are in progress.
+
+    The HTTP connection pool and the database engine are reused across cycles. A failed cycle is logged and retried at
+    the next interval. Each league is written with a single commit, which skips waiting for the disk flush if
+    POLL_SYNCHRONOUS_COMMIT is off.
+
+    :param query: the query object
+    :param config: the config object
+    :param incremental: only sync the recent and still pending matchup periods
+    :return: None
+    """
+    while not stop_event.is_set():
+        try:
+            update.sync_all(query=query, config=config, incremental=incremental,
+                            synchronous_commit=config.POLL_SYNCHRONOUS_COMMIT)
+        except Exception:
+            logging.exception("Sync failed")
+            db.session.rollback()
+        finally:
+            # return the connection to the pool and start the next cycle with a fresh snapshot
+            db.session.remove()
+
+        interval = get_poll_interval(config=config, now=datetime.utcnow())
+        logging.debug(f"Next sync in {interval} seconds")
+        stop_event.wait(interval)
+
+    logging.info("Poller stopped")
+
+
+def stop(signum, frame):
+    logging.info(f"Received signal {signum}, stopping")
+    stop_event.set()
+
+
+def main():
+    args = parse_args()
+    environment = args.get("environment")
+    config = util.get_config(environment)
+    app.config.from_object(util.get_config(environment))
+    util.set_logger(config=config, filename=__file__)
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_DATABASE_URI'] = app.config.get("DB_URI")
+    db.init_app(app)
+    query = Query(db, upsert_batch_size=config.UPSERT_BATCH_SIZE)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    with app.app_context():
+        poll(query=query, config=config, incremental=not args.get("full"))
+
+
+if __name__ == "__main__":
+    main()
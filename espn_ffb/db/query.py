@@ -1,12 +1,25 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from espn_ffb.config import Config
+from espn_ffb.db import aggregate, analytics, fingerprint, journal
 from espn_ffb.db.model.champions import Champions
+from espn_ffb.db.model.changes import Changes
 from espn_ffb.db.model.matchups import Matchups
+from espn_ffb.db.model.owner_pairs import OwnerPairs
+from espn_ffb.db.model.owner_seasons import OwnerSeasons
 from espn_ffb.db.model.owners import Owners
 from espn_ffb.db.model.records import Records
 from espn_ffb.db.model.sackos import Sackos
+from espn_ffb.db.model.sync_state import SyncState
+from espn_ffb.db.model.team_weeks import TeamWeeks
 from espn_ffb.db.model.teams import Teams
-from sqlalchemy import case, desc, func
+from sqlalchemy import and_, desc, func, literal_column, text, tuple_
 from sqlalchemy.dialects.postgresql import insert as pg_insert
-from typing import Dict, List, NamedTuple, Optional, Set, Sequence
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Set, Sequence, Tuple
+
+# the most bind parameters PostgreSQL accepts in a single statement
+MAX_BIND_PARAMS = 65535
 
 
 # exclude specific owners
@@ -40,14 +53,109 @@ class WinLossRecord(NamedTuple):
     losses: int
 
 
+class UpsertResult(NamedTuple):
+    inserted: int
+    updated: int
+
+
 class WinStreakRecord(NamedTuple):
     streak: int
     streak_owner: Optional[int]
 
 
+class H2HSummary(NamedTuple):
+    record: WinLossRecord
+    win_streak: WinStreakRecord
+
+
 class Query:
-    def __init__(self, db):
+    def __init__(self, db, league_id: Optional[int] = None, upsert_batch_size: int = Config.UPSERT_BATCH_SIZE):
+        """
+        Initialize a query object.
+
+        :param db: the database
+        :param league_id: the league every query is scoped to, or None for all leagues
+        :param upsert_batch_size: the number of rows sent in each multi-row upsert statement
+        """
         self.db = db
+        self.league_id = league_id
+        self.upsert_batch_size = upsert_batch_size
+        self.in_unit_of_work = False
+        # seasons written since the aggregates were last refreshed, refreshed once before the next commit
+        self.stale_league_years: Dict[int, Set[int]] = defaultdict(set)
+
+    def for_league(self, league_id: int) -> "Query":
+        """
+        Get a query object scoped to the given league.
+
+        :param league_id: the league ID
+        :return: the query object
+        """
+        return Query(self.db, league_id=league_id, upsert_batch_size=self.upsert_batch_size)
+
+    @contextmanager
+    def unit_of_work(self, synchronous_commit: bool = True) -> Iterator["Query"]:
+        """
+        Run every write in the block as a single transaction, committed once when the block exits or rolled back if it
+        raises, so readers never see a partially applied update. Writes that would otherwise commit on their own, e.g.
+        upsert, only execute their statements inside the block, and the aggregates of every season they wrote are
+        refreshed once before the commit. Nested blocks join the outer one.
+
+        :param synchronous_commit: wait for the commit to be flushed to disk, on PostgreSQL turning it off trades the
+            durability of the last few commits after a crash for lower commit latency
+        :return: this query object
+        """
+        if self.in_unit_of_work:
+            yield self
+            return
+
+        self.in_unit_of_work = True
+        try:
+            if not synchronous_commit and self.db.session.get_bind().dialect.name == "postgresql":
+                self.db.session.execute(text("SET LOCAL synchronous_commit = off"))
+            yield self
+            self.refresh_aggregates()
+            self.db.session.commit()
+        except Exception:
+            self.stale_league_years.clear()
+            self.db.session.rollback()
+            raise
+        finally:
+            self.in_unit_of_work = False
+
+    def commit(self):
+        """
+        Refresh the stale aggregates and commit the session, unless a unit of work is in progress and commits for it.
+
+        :return: None
+        """
+        if not self.in_unit_of_work:
+            self.refresh_aggregates()
+            self.db.session.commit()
+
+    def refresh_aggregates(self):
+        """
+        Refresh the aggregates of every season written since they were last refreshed, and journal the refreshed
+        seasons and owners.
+
+        :return: None
+        """
+        if self.stale_league_years:
+            for model, keys in aggregate.refresh(self.db.session, self.stale_league_years).items():
+                journal.record_refresh(self.db.session, model, keys)
+            self.stale_league_years.clear()
+
+    def filter_league(self, query, model):
+        """
+        Filter a query to the league of this query object.
+
+        :param query: the query
+        :param model: the model with a league_id column
+        :return: the filtered query
+        """
+        if self.league_id is None:
+            return query
+        return query.filter(model.league_id == self.league_id)
 
     def get_champions(self):
         """
@@ -56,12 +164,33 @@ class Query:
         :return: list of champions
         """
         champions = self.db.session.query(Champions, Owners) \
-            .join(Owners, Champions.owner_id == Owners.id) \
+            .join(Owners, and_(Champions.owner_id == Owners.id, Champions.league_id == Owners.league_id))
+        champions = self.filter_league(champions, Champions) \
             .order_by(desc(Champions.year)) \
             .all()
 
         return champions
 
+    def get_changes(self, since: int, limit: int) -> Sequence[Changes]:
+        """
+        Select change journal entries after a version, oldest first.
+
+        :param since: the last version the caller has seen, or 0 for every change
+        :param limit: the most entries to return
+        :return: list of changes
+        """
+        changes = self.filter_league(self.db.session.query(Changes), Changes).filter(Changes.version > since)
+        return changes.order_by(Changes.version).limit(limit).all()
+
+    def get_latest_change_version(self) -> int:
+        """
+        Select the version of the latest change.
+
+        :return: the version, or 0 if nothing changed yet
+        """
+        latest = self.filter_league(self.db.session.query(func.coalesce(func.max(Changes.version), 0)), Changes)
+        return latest.scalar()
+
     def get_distinct_matchup_team_ids(self, year: int) -> Dict[str, Set[int]]:
         distinct_matchup_team_ids = dict()
         matchups = self.get_matchups(year)
@@ -76,80 +205,67 @@ class Query:
         return distinct_matchup_team_ids
 
     def get_h2h_record_current(self, matchups: Sequence[Matchups], year: int, week: int) -> List[WinLossRecord]:
-        h2h_record = list()
-        for m in matchups:
-            wins, losses = 0, 0
-            h2h_history = [h2h for h2h in self.get_matchup_history(m.owner_id, m.opponent_owner_id, False) if
-                           not (h2h.year == year and h2h.matchup_id == week)]
+        return [summary.record for summary in self.get_h2h_summaries(matchups, year, week)]
 
-            for h2h in h2h_history:
-                if h2h.is_win:
-                    wins += 1
-                else:
-                    losses += 1
+    def get_h2h_summaries(self, matchups: Sequence[Matchups], year: int, week: int) -> List[H2HSummary]:
+        """
+        Get the head-to-head record and current win streak of every matchup of a week, from a single query.
 
-            h2h_record.append(WinLossRecord(wins, losses))
+        :param matchups: the matchups of the week
+        :param year: the year
+        :param week: the matchup period ID, excluded from the histories
+        :return: list of head-to-head summaries, in the same order as the matchups
+        """
+        pairs = [(m.owner_id, m.opponent_owner_id) for m in matchups]
+        arrays = self.get_matchup_arrays(pairs=pairs, is_playoffs=False, is_pending=False, is_consolation=False)
+        summaries = analytics.get_pair_summaries(arrays,
+                                                 analytics.get_owner_indexes(arrays, [p[0] for p in pairs]),
+                                                 analytics.get_owner_indexes(arrays, [p[1] for p in pairs]),
+                                                 exclude=(year, week))
 
-        return h2h_record
+        h2h_summaries = list()
+        for m, wins, losses, streak, streak_is_win in zip(matchups, *summaries):
+            streak_owner = (m.team_id if streak_is_win else m.opponent_team_id) if streak else None
+            h2h_summaries.append(H2HSummary(WinLossRecord(int(wins), int(losses)),
+                                            WinStreakRecord(int(streak), streak_owner)))
 
-    def get_h2h_records(self, owner_id: int, is_playoffs: bool) -> List[H2HRecord]:
-        full_name_concat = func.CONCAT(Owners.first_name, ' ', Owners.last_name)
+        return h2h_summaries
 
-        owner_name = (
-            self.db.session.query(full_name_concat)
-                .filter(Owners.id == Matchups.owner_id)
-                .label("owner_name")
-        )
+    def get_h2h_records(self, owner_id: int, is_playoffs: bool) -> List[H2HRecord]:
+        """
+        Select the head-to-head record of an owner against every opponent, from the owner pair totals.
 
-        opponent_name = (
-            self.db.session.query(full_name_concat)
-                .filter(Owners.id == Matchups.opponent_owner_id)
-                .label("opponent_name")
-        )
+        :param owner_id: the owner ID
+        :param is_playoffs: playoff instead of regular season matchups
+        :return: list of head-to-head records, ordered by opponent name
+        """
+        opponent_name = func.CONCAT(Owners.first_name, ' ', Owners.last_name).label("opponent_name")
 
-        wins = case([(Matchups.is_win.is_(True), 1)], else_=0).label("wins")
-        losses = case([(Matchups.is_loss.is_(True), 1)], else_=0).label("losses")
-
-        columns = [
-            Matchups.year,
-            Matchups.matchup_id,
-            owner_name,
-            Matchups.owner_id,
-            opponent_name,
-            Matchups.opponent_owner_id,
-            wins,
-            losses,
-        ]
-
-        record_subquery = (
-            self.db.session.query(*columns).filter_by(
-                owner_id=owner_id,
-                is_playoffs=is_playoffs,
-                is_pending=False,
-                is_consolation=False,
-            )
-            .filter(
-                Matchups.opponent_owner_id.isnot(None),
-                Matchups.opponent_owner_id.notin_(exclude_owners)
+        h2h_records_query = (
+            self.db.session.query(
+                opponent_name,
+                func.sum(OwnerPairs.wins).label("wins"),
+                func.sum(OwnerPairs.losses).label("losses"),
             )
-            .group_by(*columns)
-            .subquery()
+            .select_from(OwnerPairs)
+            .outerjoin(Owners, and_(Owners.id == OwnerPairs.opponent_owner_id,
+                                    Owners.league_id == OwnerPairs.league_id))
         )
-
         h2h_records_query = (
-            self.db.session.query(
-                record_subquery.c.opponent_name,
-                func.sum(record_subquery.c.wins).label("wins"),
-                func.sum(record_subquery.c.losses).label("losses"),
+            self.filter_league(h2h_records_query, OwnerPairs)
+            .filter(
+                OwnerPairs.owner_id == owner_id,
+                OwnerPairs.is_playoffs.is_(is_playoffs),
+                OwnerPairs.opponent_owner_id.notin_(exclude_owners)
             )
-            .group_by(record_subquery.c.opponent_name)
-            .order_by(record_subquery.c.opponent_name)
+            .group_by(opponent_name)
+            .order_by(opponent_name)
         )
 
         return [H2HRecord(*r) for r in h2h_records_query]
 
     def get_matchup_history(self, owner_id, opponent_owner_id, is_playoffs):
-        matchups = self.db.session.query(Matchups) \
+        matchups = self.filter_league(self.db.session.query(Matchups), Matchups) \
             .filter_by(owner_id=owner_id,
                        opponent_owner_id=opponent_owner_id,
                        is_playoffs=is_playoffs,
@@ -159,23 +275,91 @@ class Query:
             .all()
         return matchups
 
-    def get_matchups(self, year: int) -> Sequence[Matchups]:
+    def get_matchup_arrays(self, pairs: Optional[Iterable[Tuple[str, str]]] = None,
+                           **filter_by) -> analytics.MatchupArrays:
+        """
+        Select matchups into columnar arrays for vectorized analytics.
+
+        :param pairs: (owner ID, opponent owner ID) tuples to select the matchups of, or None for every matchup
+        :param filter_by: matchups column name to value filters, e.g. is_playoffs=False
+        :return: the matchup arrays
+        """
+        columns = [getattr(Matchups, c) for c in analytics.MATCHUP_COLUMNS]
+        matchups_query = self.filter_league(self.db.session.query(*columns), Matchups).filter_by(**filter_by)
+        if pairs is not None:
+            pairs = {pair for pair in pairs if None not in pair}
+            if not pairs:
+                return analytics.load_matchups([])
+            matchups_query = matchups_query.filter(tuple_(Matchups.owner_id, Matchups.opponent_owner_id).in_(pairs))
+        return analytics.load_matchups(matchups_query)
+
+    def get_matchups(self, year: int, matchup_id: Optional[int] = None) -> Sequence[Matchups]:
         """
-        Select matchups for a given year.
+        Select matchups for a given year, or a single matchup period of that year.
 
         :param year: the year
+        :param matchup_id: the matchup period ID, or None for every matchup period
         :return: list of matchups
         """
-        matchups = self.db.session.query(Matchups) \
-            .filter_by(year=year) \
-            .order_by(Matchups.matchup_id, Matchups.team_id) \
-            .all()
-        return matchups
+        matchups_query = self.filter_league(self.db.session.query(Matchups), Matchups).filter_by(year=year)
+        if matchup_id is not None:
+            matchups_query = matchups_query.filter_by(matchup_id=matchup_id)
+        return matchups_query.order_by(Matchups.matchup_id, Matchups.team_id).all()
+
+    def get_pending_matchup_ids(self, year: int) -> List[int]:
+        """
+        Select the matchup periods of a given year with a matchup still stored as pending.
+
+        :param year: the year
+        :return: sorted list of matchup period IDs
+        """
+        pending_query = self.filter_league(self.db.session.query(Matchups.matchup_id), Matchups) \
+            .filter_by(year=year, is_pending=True).distinct()
+        return sorted(matchup_id for matchup_id, in pending_query)
 
     def get_owners(self, exclude: bool = False):
+        owners = self.filter_league(self.db.session.query(Owners), Owners)
         if exclude:
-            return self.db.session.query(Owners).filter(Owners.id.notin_(exclude_owners))
-        return self.db.session.query(Owners).all()
+            return owners.filter(Owners.id.notin_(exclude_owners))
+        return owners.all()
+
+    def get_owner_seasons(self, year: Optional[int]) -> Sequence[OwnerSeasons]:
+        """
+        Select owner-season totals for a given year or all years if year is None.
+
+        :param year: the year
+        :return: list of owner-season totals
+        """
+        owner_seasons_query = self.filter_league(self.db.session.query(OwnerSeasons), OwnerSeasons)
+        if year:
+            owner_seasons_query = owner_seasons_query.filter_by(year=year)
+        return owner_seasons_query.all()
+
+    def get_team_weeks(self, year: int, matchup_id: int) -> Sequence[TeamWeeks]:
+        """
+        Select the cumulative record and points of every team as of the end of a matchup period.
+
+        :param year: the year
+        :param matchup_id: the matchup period ID
+        :return: list of team-week snapshots
+        """
+        team_weeks_query = self.filter_league(self.db.session.query(TeamWeeks), TeamWeeks) \
+            .filter_by(year=year, matchup_id=matchup_id)
+        return team_weeks_query.order_by(TeamWeeks.team_id).all()
+
+    def get_trophy_counts(self, model, year: Optional[int]):
+        """
+        Build a subquery counting the trophies of every owner.
+
+        :param model: the trophy model, e.g. Champions or Sackos
+        :param year: the year, or None for all years
+        :return: subquery with owner_id and count columns, without owners who have none
+        """
+        trophy_counts = self.filter_league(
+            self.db.session.query(model.owner_id.label("owner_id"), func.count().label("count")), model)
+        if year:
+            trophy_counts = trophy_counts.filter_by(year=year)
+        return trophy_counts.group_by(model.owner_id).subquery()
 
     def get_records(self, year: Optional[int]) -> Sequence[Records]:
         """
@@ -184,112 +368,90 @@ class Query:
         :param year: the year
         :return: list of records
         """
-        records_query = self.db.session.query(Records)
+        records_query = self.filter_league(self.db.session.query(Records), Records)
         if year:
             records_query = records_query.filter_by(year=year)
         return records_query.all()
 
     def get_playoff_matchups(self, year: Optional[int]) -> Sequence[Matchups]:
-        playoff_matchups = self.db.session.query(Matchups)
+        playoff_matchups = self.filter_league(self.db.session.query(Matchups), Matchups)
         if year:
             playoff_matchups = playoff_matchups.filter_by(year=year)
-        return playoff_matchups.filter(
-            Matchups.opponent_owner_id.isnot(None),
-            Matchups.is_playoffs.is_(True)).all()
+        return playoff_matchups.filter_by(is_playoffs=True).filter(
+            Matchups.opponent_owner_id.isnot(None)).all()
     
     def get_sacko_current(self):
-        sacko = self.db.session.query(Sackos) \
+        sacko = self.filter_league(self.db.session.query(Sackos), Sackos) \
             .order_by(desc(Sackos.year)) \
             .first()
         return sacko
 
-    def get_standings(self, year: Optional[int] = None, is_playoffs: bool = False) -> List[StandingsRecord]:
-        if is_playoffs:
-            return self.get_playoff_standings(year=year)
-        return self.get_regular_standings(year=year)
-
-    def get_regular_standings(self, year: Optional[int]) -> List[StandingsRecord]:
-        owners = self.get_owners()
-        records = self.get_records(year=year)
-
-        standings = []
-        for owner in owners:
-            if not year:
-                if owner.id in exclude_owners:
-                    continue
-
-            owners_records = [r for r in records if r.owner_id == owner.id]
-            # Skip owner without records. Common when viewing standings for a
-            # year where an owner did not participate.
-            if not owners_records:
-                continue
-
-            wins = sum(r.wins for r in owners_records)
-            losses = sum(r.losses for r in owners_records)
-            ties = sum(r.ties for r in owners_records)
-            total_games = wins + losses + ties
+    def get_fingerprints(self, model, **filter_by) -> Dict[Tuple, Optional[str]]:
+        """
+        Select only the primary key and fingerprint of every matching row.
 
-            points_for = sum(r.points_for for r in owners_records)
-            points_against = sum(r.points_against for r in owners_records)
+        :param model: the model class, with a fingerprint column
+        :param filter_by: column name to value filters, e.g. year
+        :return: dict of primary key tuple to fingerprint
+        """
+        pkey_columns = [getattr(model, c.name) for c in model.__table__.primary_key.columns]
+        rows = self.db.session.query(*pkey_columns, getattr(model, fingerprint.FINGERPRINT_COLUMN))
+        rows = self.filter_league(rows, model).filter_by(**filter_by)
+        return dict((tuple(row[:-1]), row[-1]) for row in rows)
 
-            avg_points_for = float(0)
-            avg_points_against = float(0)
-            win_percentage = float(0)
-            if total_games > 0:
-                win_percentage = float(f"{wins / total_games:.4f}")
-                avg_points_for = float(f"{points_for / total_games:.2f}")
-                avg_points_against = float(f"{points_against / total_games:.2f}")
+    def get_sync_watermark(self, name: str) -> Optional[str]:
+        """
+        Select the watermark stored by the last successful sync.
 
-            sackos_query = self.db.session.query(Sackos).filter_by(owner_id=owner.id)
-            champions_query = self.db.session.query(Champions).filter_by(owner_id=owner.id)
-            if year:
-                sackos_query = sackos_query.filter_by(year=year)
-                champions_query = champions_query.filter_by(year=year)
-
-            standings.append(
-                StandingsRecord(
-                    owner.id,
-                    wins,
-                    losses,
-                    ties,
-                    win_percentage,
-                    points_for,
-                    points_against,
-                    avg_points_for,
-                    avg_points_against,
-                    champions_query.count(),
-                    sackos_query.count(),
-                )
-            )
+        :param name: the sync name
+        :return: the watermark, or None if never synced
+        """
+        sync_state = self.db.session.query(SyncState).filter_by(name=name).first()
+        return sync_state.watermark if sync_state else None
 
-        standings.sort(key=lambda x: (x.win_percentage, x.avg_points_for), reverse=True)
+    def get_standings(self, year: Optional[int] = None, is_playoffs: bool = False) -> List[StandingsRecord]:
+        """
+        Select standings from the owner-season totals, aggregated by owner in a single query.
 
-        return standings
+        The ratios are computed from the totals in Python, like before the aggregates existed, so averages keep
+        rounding halves to even instead of up like SQL ROUND.
 
-    def get_playoff_standings(self, year: Optional[int]) -> List[StandingsRecord]:
-        owners = self.get_owners()
-        matchups = self.get_playoff_matchups(year=year)
+        :param year: the year, or None for the all-time standings
+        :param is_playoffs: playoff instead of regular season standings
+        :return: list of standings records, ordered by win percentage and then average points for
+        """
+        prefix = "playoff_" if is_playoffs else ""
+        championships = self.get_trophy_counts(Champions, year=year)
+        sackos = self.get_trophy_counts(Sackos, year=year)
+        owner_ids = self.filter_league(self.db.session.query(Owners.id), Owners)
+
+        totals = self.db.session.query(
+            OwnerSeasons.owner_id,
+            func.sum(getattr(OwnerSeasons, prefix + "wins")),
+            func.sum(getattr(OwnerSeasons, prefix + "losses")),
+            func.sum(getattr(OwnerSeasons, prefix + "ties")),
+            func.sum(getattr(OwnerSeasons, prefix + "points_for")),
+            func.sum(getattr(OwnerSeasons, prefix + "points_against")),
+            func.coalesce(func.max(championships.c.count), 0),
+            func.coalesce(func.max(sackos.c.count), 0),
+        ) \
+            .outerjoin(championships, championships.c.owner_id == OwnerSeasons.owner_id) \
+            .outerjoin(sackos, sackos.c.owner_id == OwnerSeasons.owner_id)
+        # Owners without a season are skipped. Common when viewing standings
+        # for a year where an owner did not participate.
+        totals = self.filter_league(totals, OwnerSeasons).filter(OwnerSeasons.owner_id.in_(owner_ids))
+        if year:
+            totals = totals.filter(OwnerSeasons.year == year)
+        else:
+            totals = totals.filter(OwnerSeasons.owner_id.notin_(exclude_owners))
+        if is_playoffs:
+            totals = totals.filter(OwnerSeasons.playoff_games > 0)
+        totals = totals.group_by(OwnerSeasons.owner_id)
 
         standings = list()
-        for owner in owners:
-            if not year:
-                if owner.id in exclude_owners:
-                    continue
-
-            owner_matchups = [m for m in matchups if m.owner_id == owner.id]
-            # Skip owner without records. Common when viewing standings for a
-            # year where an owner did not participate.
-            if not owner_matchups:
-                continue
-
-            wins = sum(m.is_win for m in owner_matchups)
-            losses = sum(m.is_loss for m in owner_matchups)
-            ties = sum(1 if m.team_score == m.opponent_team_score else 0 for m in owner_matchups)
+        for owner_id, wins, losses, ties, points_for, points_against, championships, sackos in totals:
             total_games = wins + losses + ties
 
-            points_for = sum(m.team_score for m in owner_matchups)
-            points_against = sum(m.opponent_team_score for m in owner_matchups)
-
             avg_points_for = float(0)
             avg_points_against = float(0)
             win_percentage = float(0)
@@ -298,49 +460,29 @@ class Query:
                 avg_points_for = float(f"{points_for / total_games:.2f}")
                 avg_points_against = float(f"{points_against / total_games:.2f}")
 
-            sackos_query = self.db.session.query(Sackos).filter_by(owner_id=owner.id)
-            champions_query = self.db.session.query(Champions).filter_by(owner_id=owner.id)
-            if year:
-                sackos_query = sackos_query.filter_by(year=year)
-                champions_query = champions_query.filter_by(year=year)
-
-            standings.append(
-                StandingsRecord(
-                    owner.id,
-                    wins,
-                    losses,
-                    ties,
-                    win_percentage,
-                    points_for,
-                    points_against,
-                    avg_points_for,
-                    avg_points_against,
-                    champions_query.count(),
-                    sackos_query.count(),
-                )
-            )
+            standings.append(StandingsRecord(owner_id, wins, losses, ties, win_percentage, points_for, points_against,
+                                             avg_points_for, avg_points_against, championships, sackos))
 
         standings.sort(key=lambda x: (x.win_percentage, x.avg_points_for), reverse=True)
-
         return standings
 
-    def get_team_id_to_record(self, year: int, week: int) -> Dict[str, WinLossRecord]:
-        team_id_to_record: Dict[str, WinLossRecord] = dict()
-        matchups = self.get_matchups(year)
-        for m in matchups:
-            if m.team_id in team_id_to_record:
-                r = team_id_to_record[m.team_id]
-            else:
-                r = WinLossRecord(0, 0)
-                team_id_to_record[m.team_id] = r
+    def get_regular_standings(self, year: Optional[int]) -> List[StandingsRecord]:
+        return self.get_standings(year=year, is_playoffs=False)
 
-            if m.matchup_id < week:
-                if m.team_score > m.opponent_team_score:
-                    team_id_to_record[m.team_id] = WinLossRecord(r.wins + 1, r.losses)
-                if m.team_score < m.opponent_team_score:
-                    team_id_to_record[m.team_id] = WinLossRecord(r.wins, r.losses + 1)
+    def get_playoff_standings(self, year: Optional[int]) -> List[StandingsRecord]:
+        return self.get_standings(year=year, is_playoffs=True)
+
+    def get_team_id_to_record(self, year: int, week: int) -> Dict[str, WinLossRecord]:
+        """
+        Get the record of every team before a matchup period, from the snapshots of the previous period.
 
-        return team_id_to_record
+        :param year: the year
+        :param week: the matchup period ID
+        :return: dict of team ID to win-loss record
+        """
+        if week <= 1:
+            return dict((t.team_id, WinLossRecord(0, 0)) for t in self.get_team_weeks(year, 1))
+        return dict((t.team_id, WinLossRecord(t.wins, t.losses)) for t in self.get_team_weeks(year, week - 1))
 
     def get_team_id_to_team_name(self, year):
         records = self.get_teams(year)
@@ -353,60 +495,68 @@ class Query:
         :param year: the year
         :return: list of teams
         """
-        teams = self.db.session.query(Teams).filter_by(year=year).all()
+        teams = self.filter_league(self.db.session.query(Teams), Teams).filter_by(year=year).all()
         return teams
 
     def get_win_streak_by_year(self, matchups: Sequence[Matchups], year: int, week: int) -> List[WinStreakRecord]:
-        win_streaks = list()
-        for m in matchups:
-            # noinspection DuplicatedCode
-            streak, streak_owner, streak_type = 0, None, None
-            h2h_history = [h2h for h2h in self.get_matchup_history(m.owner_id, m.opponent_owner_id, False) if
-                           not (h2h.year == year and h2h.matchup_id == week)]
-
-            for h2h in h2h_history:
-                if streak == 0:
-                    streak_type = h2h.is_win
-                    streak_owner = m.team_id if streak_type else m.opponent_team_id
-
-                if h2h.is_win != streak_type:
-                    streak_owner = m.team_id if streak_type else m.opponent_team_id
-                    break
-
-                streak += 1
-            win_streaks.append(WinStreakRecord(streak, streak_owner))
-
-        return win_streaks
+        return [summary.win_streak for summary in self.get_h2h_summaries(matchups, year, week)]
 
     def get_distinct_years(self):
         distinct_matchup_years = (
-            self.db.session.query(Matchups.year)
+            self.filter_league(self.db.session.query(Matchups.year), Matchups)
                 .distinct(Matchups.year)
                 .order_by(Matchups.year.desc())
         )
 
         return [matchup.year for matchup in distinct_matchup_years]
 
-    def upsert_matchups(self, matchups):
-        for m in matchups:
-            statement = pg_insert(Matchups) \
-                .values(**m.as_dict()) \
-                .on_conflict_do_update(constraint=Matchups.PKEY_NAME, set_=m.props_dict())
-            self.db.session.execute(statement)
-        self.db.session.commit()
-
-    def upsert_records(self, records):
-        for record in records:
-            statement = pg_insert(Records) \
-                .values(**record.as_dict()) \
-                .on_conflict_do_update(constraint=Records.PKEY_NAME, set_=record.props_dict())
-            self.db.session.execute(statement)
-        self.db.session.commit()
-
-    def upsert_teams(self, teams):
-        for team in teams:
-            statement = pg_insert(Teams) \
-                .values(**team.as_dict()) \
-                .on_conflict_do_update(constraint=Teams.PKEY_NAME, set_=team.props_dict())
-            self.db.session.execute(statement)
-        self.db.session.commit()
+    def set_sync_watermark(self, name: str, watermark: str):
+        self.db.session.merge(SyncState(name=name, watermark=watermark, updated_at=datetime.utcnow()))
+        self.commit()
+
+    def upsert(self, model, rows: Iterable, batch_size: Optional[int] = None) -> UpsertResult:
+        """
+        Insert or update rows with one multi-row INSERT ... ON CONFLICT DO UPDATE statement per batch.
+
+        Rows with the same primary key are collapsed to the last one, since a single statement cannot update a row
+        twice. Each statement returns whether every row was inserted or updated (xmax is 0 for a freshly inserted row).
+        The fingerprint column, if the model has one, is computed here.
+
+        :param model: the model class, with a PKEY_NAME constraint
+        :param rows: the model instances, or dicts of column name to value
+        :param batch_size: the number of rows per statement, defaults to the query object's upsert batch size
+        :return: the number of inserted and updated rows
+        """
+        table = model.__table__
+        rows = (row if isinstance(row, Mapping) else row.as_dict() for row in rows)
+        rows = (fingerprint.add_fingerprint(model, row) for row in rows)
+        rows = list({fingerprint.get_pkey(model, row): row for row in rows}.values())
+
+        batch_size = min(batch_size or self.upsert_batch_size, MAX_BIND_PARAMS // len(table.columns))
+        changes = list()
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            statement = pg_insert(model).values(batch)
+            statement = statement.on_conflict_do_update(
+                constraint=model.PKEY_NAME,
+                set_={c.name: statement.excluded[c.name] for c in table.columns if not c.primary_key}
+            ).returning(*table.primary_key.columns, literal_column("xmax = 0"))
+            changes.extend((tuple(row[:-1]), journal.INSERT if row[-1] else journal.UPDATE)
+                           for row in self.db.session.execute(statement))
+        if model in aggregate.SOURCE_MODELS:
+            for league_id, years in aggregate.get_league_years(rows).items():
+                self.stale_league_years[league_id] |= years
+        journal.record(self.db.session, model, changes)
+        self.commit()
+
+        inserted = sum(1 for _, operation in changes if operation == journal.INSERT)
+        return UpsertResult(inserted=inserted, updated=len(changes) - inserted)
+
+    def upsert_matchups(self, matchups) -> UpsertResult:
+        return self.upsert(Matchups, matchups)
+
+    def upsert_records(self, records) -> UpsertResult:
+        return self.upsert(Records, records)
+
+    def upsert_teams(self, teams) -> UpsertResult:
+        return self.upsert(Teams, teams)
@@ -1,15 +1,19 @@
 import argparse
 from espn_ffb import util
+from espn_ffb.config import Config
+from espn_ffb.db import fingerprint
 from espn_ffb.db.database import db
+from espn_ffb.db.model.champions import Champions
 from espn_ffb.db.model.matchups import Matchups
 from espn_ffb.db.model.records import Records
+from espn_ffb.db.model.sackos import Sackos
 from espn_ffb.db.model.teams import Teams
 from espn_ffb.db.query import Query
-from espn_ffb.espn import api
+from espn_ffb.espn import api, cassette, fetch
 from espn_ffb.espn.model.league_setting import LeagueSetting
 from flask import Flask
 import logging
-from typing import Mapping, Sequence, Set
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple, Type
 
 app = Flask(__name__)
 
@@ -19,123 +23,230 @@ def parse_args() -> Mapping:
 
     :return: dict of parsed arguments
     """
-    parser = argparse.ArgumentParser(description="Update matchups, records, and teams")
+    parser = argparse.ArgumentParser(description="Update matchups, records, teams, champions and sackos")
     parser.add_argument('-e', '--environment', help="The development environment", type=str, required=True,
                         choices=util.SUPPORTED_ENVIRONMENTS)
+    parser.add_argument('-i', '--incremental', help="Only sync the recent and still pending matchup periods",
+                        action="store_true")
+    parser.add_argument('-f', '--force', help="Sync even if nothing changed since the last sync", action="store_true")
+    cassette.add_arguments(parser)
     return vars(parser.parse_args())
 
 
-def update(query: Query, league_settings: Sequence[LeagueSetting], year: int):
+def sync_all(query: Query, config: Type[Config], incremental: bool = False, force: bool = False,
+             synchronous_commit: bool = True):
     """
-    Update matchups, records, and teams for the current year.
+    Sync the current year of every configured league. A failed league is logged and does not stop the others.
 
     :param query: the query object
-    :param league_settings: the league settings for the current year
-    :param year: the current year
+    :param config: the config object
+    :param incremental: only sync the recent and still pending matchup periods
+    :param force: skip the probe and always sync
+    :param synchronous_commit: wait for each league's commit to be flushed to disk
     :return: None
     """
-    update_records_and_teams(query=query, league_settings=league_settings, year=year)
-    update_matchups(query=query, league_settings=league_settings, year=year)
+    for league_config in util.get_league_configs(config):
+        logging.info(f"Syncing league {league_config.LEAGUE_ID}")
+        try:
+            sync(query=query.for_league(league_config.LEAGUE_ID), config=league_config, incremental=incremental,
+                 force=force, synchronous_commit=synchronous_commit)
+        except Exception:
+            logging.exception(f"Sync failed for league {league_config.LEAGUE_ID}")
+            query.db.session.rollback()
+
+
+def sync(query: Query, config: Type[Config], incremental: bool = False, force: bool = False,
+         synchronous_commit: bool = True) -> bool:
+    """
+    Probe ESPN for changes and update the current year only if something changed since the last sync.
 
+    The probe fingerprints the league status and the scores of the sync matchup periods, the active one, the one before
+    it and any earlier one still stored as pending, so a final result or a stat correction after the period rolls over
+    is still picked up. An incremental sync fetches and diffs only those matchup periods. Full and incremental syncs
+    keep separate watermarks, so a full sync is never skipped because of an incremental one.
 
-def update_matchups(query: Query, league_settings: Sequence[LeagueSetting], year: int):
+    Everything is fetched before the first write, bypassing the response cache, so the data is at least as recent as
+    the watermark probed before it. A change that lands in between moves the next probe, which syncs again. Teams,
+    records, matchups, their aggregates and the sync watermark are then written as one unit of work with a single
+    commit, so a failure midway leaves the previous sync in place.
+
+    :param query: the query object
+    :param config: the config object
+    :param incremental: only sync the recent and still pending matchup periods
+    :param force: skip the probe and always sync
+    :param synchronous_commit: wait for the commit to be flushed to disk
+    :return: True if an update ran
     """
-    Update matchups for the current year.
+    year = config.CURRENT_YEAR
+    status = api.get_league_status(config=config)
+    matchup_period_ids = get_sync_matchup_period_ids(query=query, year=year,
+                                                     current_matchup_period_id=status.get("currentMatchupPeriod"))
+    watermark_name = get_sync_watermark_name(config, incremental=incremental)
+    watermark = api.get_sync_watermark(config=config, status=status, matchup_period_ids=matchup_period_ids)
+    if not force and watermark == query.get_sync_watermark(watermark_name):
+        logging.info("No changes since the last sync")
+        return False
+
+    if incremental and matchup_period_ids:
+        logging.info(f"Syncing matchup periods {matchup_period_ids}")
+        league_settings = api.get_league_settings(config=config, years=[year], matchup_period_ids=matchup_period_ids,
+                                                  use_cache=False)
+    else:
+        matchup_period_ids = None
+        league_settings = api.get_league_settings(config=config, years=[year], use_cache=False)
+
+    with query.unit_of_work(synchronous_commit=synchronous_commit):
+        update(query=query, league_settings=league_settings, year=year, matchup_period_ids=matchup_period_ids)
+        query.set_sync_watermark(watermark_name, watermark)
+        if not incremental:
+            # a full sync covers everything an incremental one would, so the next incremental probe can skip too
+            query.set_sync_watermark(get_sync_watermark_name(config, incremental=True), watermark)
+    return True
+
+
+def get_sync_matchup_period_ids(query: Query, year: int, current_matchup_period_id: Optional[int]) -> List[int]:
+    """
+    Get the matchup periods probed and incrementally synced: the active one, the one before it, and any earlier one
+    with a matchup still stored as pending.
 
     :param query: the query object
-    :param league_settings: the league settings for the current year
     :param year: the current year
-    :return: None
+    :param current_matchup_period_id: the active matchup period ID
+    :return: sorted list of matchup period IDs, empty if there is no active matchup period
     """
-    matchups = set(m for m in query.get_matchups(year=year))
-    current_matchups = get_current_matchups(league_settings=league_settings) - matchups
+    if not current_matchup_period_id:
+        return []
+    matchup_period_ids = {current_matchup_period_id, current_matchup_period_id - 1}
+    matchup_period_ids.update(m for m in query.get_pending_matchup_ids(year) if m < current_matchup_period_id)
+    return sorted(m for m in matchup_period_ids if m > 0)
 
-    count = len(current_matchups)
-    if count == 0:
-        logging.info("No matchups to update")
-        return
 
-    logging.info(f"Updating {count} matchup scores")
-    query.upsert_matchups(current_matchups)
+def get_sync_watermark_name(config: Type[Config], incremental: bool = False) -> str:
+    name = f"{config.LEAGUE_ID}:{config.CURRENT_YEAR}"
+    return f"{name}:incremental" if incremental else name
 
 
-def get_current_matchups(league_settings: Sequence[LeagueSetting]) -> Set[Matchups]:
+def update(query: Query, league_settings: Sequence[LeagueSetting], year: int,
+           matchup_period_ids: Optional[Sequence[int]] = None):
     """
-    Get the current matchups for the current year from the ESPN API.
+    Update matchups, records, teams, champions and sackos for the current year in a single transaction.
 
+    :param query: the query object
     :param league_settings: the league settings for the current year
-    :return: set of matchups for the current year
+    :param year: the current year
+    :param matchup_period_ids: the only matchup periods present in the league settings, or None for the whole season
+    :return: None
     """
-    current_matchups = api.get_matchups(league_settings=league_settings)
-    return set(m for m in current_matchups)
+    with query.unit_of_work():
+        update_records_and_teams(query=query, league_settings=league_settings, year=year)
+        changed_matchups = update_matchups(query=query, league_settings=league_settings, year=year,
+                                           matchup_period_ids=matchup_period_ids)
+        update_trophies(query=query, league_settings=league_settings, changed_matchups=changed_matchups)
 
 
-def update_records_and_teams(query: Query, league_settings: Sequence[LeagueSetting], year: int):
+def update_matchups(query: Query, league_settings: Sequence[LeagueSetting], year: int,
+                    matchup_period_ids: Optional[Sequence[int]] = None):
     """
-    Update records and teams for the current year.
+    Update matchups for the current year.
 
     :param query: the query object
     :param league_settings: the league settings for the current year
     :param year: the current year
+    :param matchup_period_ids: only diff against these matchup periods, or None for the whole season
+    :return: list of changed matchup rows
+    """
+    rows = api.get_matchup_rows(league_settings)
+    if matchup_period_ids is None:
+        fingerprints = query.get_fingerprints(Matchups, year=year)
+    else:
+        # the schedule filter is only a hint to ESPN, rows of other periods would all look changed
+        rows = (row for row in rows if row["matchup_id"] in matchup_period_ids)
+        fingerprints = dict()
+        for matchup_period_id in matchup_period_ids:
+            fingerprints.update(query.get_fingerprints(Matchups, year=year, matchup_id=matchup_period_id))
+    return upsert_changed(query=query, model=Matchups, rows=rows, fingerprints=fingerprints, name="matchup scores")
+
+
+def update_trophies(query: Query, league_settings: Sequence[LeagueSetting], changed_matchups: Iterable[Mapping]):
+    """
+    Update champions and sackos of the seasons whose final playoff or consolation matchups changed.
+
+    :param query: the query object
+    :param league_settings: the league settings for the current year
+    :param changed_matchups: the changed matchup rows
     :return: None
     """
-    records = set(r for r in query.get_records(year=year))
-    teams = set(t for t in query.get_teams(year=year))
-    current_records, current_teams = get_current_records_and_teams(league_settings=league_settings)
+    final_matchup_period_ids = {(l.league_id, l.season_id): l.final_matchup_period_id for l in league_settings}
+    changed_seasons = {(m["league_id"], m["year"]) for m in changed_matchups
+                       if (m["is_playoffs"] or m["is_consolation"])
+                       and m["matchup_id"] == final_matchup_period_ids.get((m["league_id"], m["year"]))}
+    if not changed_seasons:
+        return
 
-    update_teams(query=query, current_teams=current_teams, teams=teams)
-    update_records(query=query, current_records=current_records, records=records)
+    league_settings = [l for l in league_settings if (l.league_id, l.season_id) in changed_seasons]
+    for model, rows, name in ((Champions, api.get_champion_rows(league_settings), "champions"),
+                              (Sackos, api.get_sacko_rows(league_settings), "sackos")):
+        rows = list(rows)
+        if rows:
+            logging.info(f"Updating {len(rows)} {name}")
+            query.upsert(model, rows)
 
 
-def get_current_records_and_teams(league_settings: Sequence[LeagueSetting]) -> (Set[Records], Set[Teams]):
+def update_records_and_teams(query: Query, league_settings: Sequence[LeagueSetting], year: int):
     """
-    Get the current records and teams for the current year from the ESPN API.
+    Update records and teams for the current year.
 
+    :param query: the query object
     :param league_settings: the league settings for the current year
-    :return: tuple of a set of records and a set of teams
+    :param year: the current year
+    :return: None
     """
-    records, teams = api.get_records_and_teams(league_settings=league_settings)
-    return set(r for r in records), set(t for t in teams)
+    upsert_changed(query=query, model=Teams, rows=api.get_team_rows(league_settings),
+                   fingerprints=query.get_fingerprints(Teams, year=year), name="teams")
+    upsert_changed(query=query, model=Records, rows=api.get_record_rows(league_settings),
+                   fingerprints=query.get_fingerprints(Records, year=year), name="records")
 
 
-def update_records(query: Query, current_records: Set[Records], records: Set[Records]):
+def get_changed_rows(model, rows: Iterable[Mapping], fingerprints: Mapping[Tuple, Optional[str]]) -> List[Mapping]:
     """
-    Update records for the given year.
+    Get the rows that are new or whose content fingerprint differs from the stored one.
 
-    :param query: the query object
-    :param current_records: the records for the current year from the api
-    :param records: the records for the current year from the db
-    :return:
+    :param model: the model class, with a fingerprint column
+    :param rows: dicts of column name to value from the api
+    :param fingerprints: dict of primary key tuple to stored fingerprint
+    :return: list of changed rows, with their fingerprints set
     """
-    current_records = current_records - records
-
-    count = len(current_records)
-    if count == 0:
-        logging.info("No records to update")
-        return
+    changed = list()
+    for row in rows:
+        row = fingerprint.add_fingerprint(model, row)
+        if fingerprints.get(fingerprint.get_pkey(model, row)) != row[fingerprint.FINGERPRINT_COLUMN]:
+            changed.append(row)
+    return changed
 
-    logging.info(f"Updating {count} records")
-    query.upsert_records(current_records)
 
-
-def update_teams(query: Query, current_teams: Set[Teams], teams: Set[Teams]):
+def upsert_changed(query: Query, model, rows: Iterable[Mapping], fingerprints: Mapping[Tuple, Optional[str]],
+                   name: str):
     """
-    Update teams for the current year.
+    Upsert the rows that changed since they were last written.
 
     :param query: the query object
-    :param current_teams: the teams for the current year from the api
-    :param teams: the teams for the current year from the db
-    :return: None
+    :param model: the model class, with a fingerprint column
+    :param rows: dicts of column name to value from the api
+    :param fingerprints: dict of primary key tuple to stored fingerprint
+    :param name: the name of the rows in log messages
+    :return: list of changed rows
     """
-    current_teams = current_teams - teams
+    changed = get_changed_rows(model=model, rows=rows, fingerprints=fingerprints)
 
-    count = len(current_teams)
+    count = len(changed)
     if count == 0:
-        logging.info("No teams to update")
-        return
+        logging.info(f"No {name} to update")
+        return changed
 
-    logging.info(f"Updating {count} teams")
-    query.upsert_teams(current_teams)
+    logging.info(f"Updating {count} {name}")
+    result = query.upsert(model, changed)
+    logging.info(f"Inserted {result.inserted} and updated {result.updated} {name}")
+    return changed
 
 
 def main():
@@ -148,11 +259,19 @@ def main():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SQLALCHEMY_DATABASE_URI'] = app.config.get("DB_URI")
     db.init_app(app)
-    query = Query(db)
-
-    with app.app_context():
-        league_settings = api.get_league_settings(config=config, years=[config.CURRENT_YEAR])
-        update(query=query, league_settings=league_settings, year=config.CURRENT_YEAR)
+    query = Query(db, upsert_batch_size=config.UPSERT_BATCH_SIZE)
+
+    recording = cassette.Cassette.from_args(args)
+    if recording:
+        fetch.set_fetcher(fetch.Fetcher.from_config(config, cassette=recording))
+
+    try:
+        with app.app_context():
+            sync_all(query=query, config=config, incremental=args.get("incremental"), force=args.get("force"))
+            logging.info(f"ESPN fetch stats: {fetch.get_fetcher(config).stats}")
+    finally:
+        if recording:
+            recording.close()
 
 
 if __name__ == "__main__":
@@ -1,13 +1,19 @@
+from espn_ffb import util
 from espn_ffb.config import Config
 from espn_ffb.db.model.matchups import Matchups
 from espn_ffb.db.model.owners import Owners
 from espn_ffb.db.model.records import Records
 from espn_ffb.db.model.teams import Teams
+from espn_ffb.espn import fetch
+from espn_ffb.espn.fetch import Fetcher
+from espn_ffb.espn.model import league_setting as ls
 from espn_ffb.espn.model.league_setting import LeagueSetting
+from espn_ffb.espn.model import matchup_score as ms
 from espn_ffb.espn.model.matchup_score import MatchupScore
+import hashlib
+import json
 import logging
-import requests
-from typing import List, Mapping, Sequence, Type
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Type
 
 
 def get_league_years(config: Type[Config]) -> Sequence[int]:
@@ -17,23 +23,243 @@ def get_league_years(config: Type[Config]) -> Sequence[int]:
     :param config: the config object
     :return: list of previous league years
     """
-    league_office_url = f"https://fantasy.espn.com/apis/v3/games/FFL/seasons/{config.CURRENT_YEAR}/segments/0/leagues" \
-                        f"/{config.LEAGUE_ID}?view=mSettings"
-    data = requests.get(league_office_url, cookies=config.COOKIES).json()
-    years = data.get("status").get("previousSeasons")
+    data = ls.get_league_data(fetcher=fetch.get_fetcher(config), config=config, year=config.CURRENT_YEAR,
+                              views=[ls.SETTINGS_VIEW])
+    years = list(data.get("status").get("previousSeasons"))
     years.append(config.CURRENT_YEAR)
     return years
 
 
-def get_league_settings(config: Type[Config], years: Sequence[int]) -> Sequence[LeagueSetting]:
+def get_current_matchup_period(config: Type[Config], use_cache: bool = True) -> int:
+    """
+    Get the active matchup period of the current year.
+
+    :param config: the config object
+    :param use_cache: serve the response from the response cache when possible
+    :return: the current matchup period ID
+    """
+    data = ls.get_league_data(fetcher=fetch.get_fetcher(config), config=config, year=config.CURRENT_YEAR,
+                              views=[ls.SETTINGS_VIEW], use_cache=use_cache)
+    return data.get("status").get("currentMatchupPeriod")
+
+
+def get_league_status(config: Type[Config]) -> Mapping:
+    """
+    Get the league status of the current year, bypassing the response cache.
+
+    :param config: the config object
+    :return: the league status, with the current matchup period
+    """
+    return ls.get_league_data(fetcher=fetch.get_fetcher(config), config=config, year=config.CURRENT_YEAR,
+                              views=[ls.STATUS_VIEW], use_cache=False).get("status")
+
+
+def get_sync_watermark(config: Type[Config], status: Mapping, matchup_period_ids: Sequence[int]) -> str:
+    """
+    Probe ESPN for a cheap fingerprint of the current season.
+
+    Only the scores of the given matchup periods are fetched, bypassing the response cache. The fingerprint changes
+    whenever the scoring period advances, a transaction is processed or a score in those periods moves, including a
+    stat correction to a finished period.
+
+    :param config: the config object
+    :param status: the league status, from get_league_status
+    :param matchup_period_ids: the matchup periods to fingerprint the scores of
+    :return: the hex digest watermark
+    """
+    schedule = ls.get_league_data(fetcher=fetch.get_fetcher(config), config=config, year=config.CURRENT_YEAR,
+                                  views=[ls.MATCHUP_SCORE_VIEW], matchup_period_ids=matchup_period_ids,
+                                  use_cache=False).get("schedule") or []
+
+    scores = [(m.get("id"), m.get("winner"), (m.get("home") or {}).get("totalPoints"),
+               (m.get("away") or {}).get("totalPoints")) for m in schedule]
+    fingerprint = json.dumps([status, scores], sort_keys=True)
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+
+def get_league_data(config: Type[Config], years: Sequence[int], fetcher: Optional[Fetcher] = None,
+                    matchup_period_ids: Optional[Sequence[int]] = None, use_cache: bool = True) -> Sequence[Mapping]:
+    """
+    Fetch the raw league data for the given years.
+
+    :param config: the config object
+    :param years: list of league years
+    :param fetcher: the fetcher, defaults to the process-wide fetcher
+    :param matchup_period_ids: limit the schedule to these matchup periods, or None for the whole season
+    :param use_cache: serve the responses from the response cache when possible
+    :return: list of league data, in the same order as the years
+    """
+    return get_multi_league_data(league_years=[(config, year) for year in years], fetcher=fetcher,
+                                 matchup_period_ids=matchup_period_ids, use_cache=use_cache)
+
+
+def get_multi_league_data(league_years: Sequence[Tuple[Type[Config], int]], fetcher: Optional[Fetcher] = None,
+                          matchup_period_ids: Optional[Sequence[int]] = None,
+                          use_cache: bool = True) -> Sequence[Mapping]:
+    """
+    Fetch the raw league data for the given league configs and years.
+
+    Every request is issued concurrently on the fetcher's worker pool, so the total time is bounded by the slowest
+    request rather than the sum of all of them. When Config.FETCH_COMBINED_VIEWS is set, each season is fetched with a
+    single multi-view request, otherwise each view is fetched separately and merged.
+
+    :param league_years: list of (league config, year) tuples
+    :param fetcher: the fetcher, defaults to the process-wide fetcher
+    :param matchup_period_ids: limit the schedule to these matchup periods, or None for the whole season
+    :param use_cache: serve the responses from the response cache when possible
+    :return: list of league data, in the same order as the league years
+    """
+    if not league_years:
+        return list()
+
+    config = league_years[0][0]
+    fetcher = fetcher or fetch.get_fetcher(config)
+
+    if config.FETCH_COMBINED_VIEWS:
+        logging.info(f"Fetching {len(league_years)} seasons")
+        return fetcher.map(lambda league_year: ls.get_league_data(fetcher=fetcher, config=league_year[0],
+                                                                  year=league_year[1],
+                                                                  matchup_period_ids=matchup_period_ids,
+                                                                  use_cache=use_cache),
+                           league_years)
+
+    league_year_views = [(i, view) for i in range(len(league_years)) for view in ls.VIEWS]
+
+    def fetch_view(league_year_view):
+        i, view = league_year_view
+        league_config, year = league_years[i]
+        return ls.get_view_data(fetcher=fetcher, config=league_config, year=year, view=view,
+                                matchup_period_ids=matchup_period_ids, use_cache=use_cache)
+
+    logging.info(f"Fetching {len(league_year_views)} views for {len(league_years)} seasons")
+    view_data: List[Dict[str, Mapping]] = [dict() for _ in league_years]
+    for (i, view), data in zip(league_year_views, fetcher.map(fetch_view, league_year_views)):
+        view_data[i][view] = data
+
+    return [ls.merge_view_data(data) for data in view_data]
+
+
+def get_season_league_data(league_year: Tuple[Type[Config], int], fetcher: Fetcher) -> Mapping:
+    """
+    Fetch the raw league data of a single season, requesting separate views one after another.
+
+    Unlike get_multi_league_data, this never waits on the fetcher's worker pool, so it can run on it.
+
+    :param league_year: (league config, year) tuple
+    :param fetcher: the fetcher
+    :return: dict of league data
+    """
+    config, year = league_year
+    if config.FETCH_COMBINED_VIEWS:
+        return ls.get_league_data(fetcher=fetcher, config=config, year=year)
+    return ls.merge_view_data({view: ls.get_view_data(fetcher=fetcher, config=config, year=year, view=view)
+                               for view in ls.VIEWS})
+
+
+def get_all_league_years(config: Type[Config], fetcher: Optional[Fetcher] = None) -> List[Tuple[Type[Config], int]]:
+    """
+    Get every year of every configured league.
+
+    :param config: the config object
+    :param fetcher: the fetcher, defaults to the process-wide fetcher
+    :return: list of (league config, year) tuples, grouped by league in Config.LEAGUE_IDS order and then in year order
+    """
+    fetcher = fetcher or fetch.get_fetcher(config)
+    league_configs = util.get_league_configs(config)
+    return [(league_config, year)
+            for league_config, years in zip(league_configs, fetcher.map(get_league_years, league_configs))
+            for year in years]
+
+
+def get_all_league_settings(config: Type[Config], fetcher: Optional[Fetcher] = None) -> Sequence[LeagueSetting]:
+    """
+    Get league settings for every year of every configured league.
+
+    All leagues share the fetcher's connection and worker pools.
+
+    :param config: the config object
+    :param fetcher: the fetcher, defaults to the process-wide fetcher
+    :return: list of league settings, grouped by league in Config.LEAGUE_IDS order and then in year order
+    """
+    fetcher = fetcher or fetch.get_fetcher(config)
+    league_years = get_all_league_years(config, fetcher=fetcher)
+    return parse_league_settings(get_multi_league_data(league_years=league_years, fetcher=fetcher),
+                                 keep_data=config.KEEP_RAW_DATA)
+
+
+def get_league_settings(config: Type[Config], years: Sequence[int], fetcher: Optional[Fetcher] = None,
+                        matchup_period_ids: Optional[Sequence[int]] = None,
+                        use_cache: bool = True) -> Sequence[LeagueSetting]:
     """
     Get league settings for the given years.
 
     :param config: the config object
-    :param years: list of previous league years
+    :param years: list of league years
+    :param fetcher: the fetcher, defaults to the process-wide fetcher
+    :param matchup_period_ids: limit the schedule to these matchup periods, or None for the whole season
+    :param use_cache: serve the responses from the response cache when possible
+    :return: list of league settings, in the same order as the years
+    """
+    league_data = get_league_data(config=config, years=years, fetcher=fetcher, matchup_period_ids=matchup_period_ids,
+                                  use_cache=use_cache)
+    return parse_league_settings(league_data, keep_data=config.KEEP_RAW_DATA)
+
+
+def parse_league_settings(league_data: Sequence[Mapping], keep_data: bool = False) -> Sequence[LeagueSetting]:
+    """
+    Parse already-fetched league data into league settings.
+
+    :param league_data: list of league data
+    :param keep_data: keep the raw data of every parsed model, e.g. for debugging
     :return: list of league settings
     """
-    return [LeagueSetting(config=config, year=year) for year in years]
+    return [LeagueSetting(data, keep_data) for data in league_data]
+
+
+def get_final_matchup_score(league_setting: LeagueSetting, playoff_tier_type: str) -> Optional[MatchupScore]:
+    """
+    Get the decided matchup score of a bracket in the final matchup period, e.g. the championship game.
+
+    :param league_setting: the league setting
+    :param playoff_tier_type: the bracket, e.g. matchup_score.WINNERS_BRACKET
+    :return: the matchup score, or None if the final is not decided yet or the bracket has no single final
+    """
+    finals = [m for m in league_setting.matchup_scores
+              if m.playoff_tier_type == playoff_tier_type and m.team_count == 2
+              and m.matchup_period_id == league_setting.final_matchup_period_id]
+    if len(finals) != 1 or finals[0].winning_team_id is None:
+        return None
+    return finals[0]
+
+
+def get_champion_rows(league_settings: Sequence[LeagueSetting]) -> Iterator[Mapping]:
+    """
+    Generate champion rows for the given league settings, the winner of the winners bracket final.
+
+    :param league_settings: list of league settings
+    :return: generator of dicts of champions column name to value, only for seasons with a decided final
+    """
+    for l in league_settings:
+        final = get_final_matchup_score(l, ms.WINNERS_BRACKET)
+        if final is not None:
+            yield dict(league_id=l.league_id,
+                       year=l.season_id,
+                       owner_id=get_team_id_to_owner_id(l).get(final.winning_team_id))
+
+
+def get_sacko_rows(league_settings: Sequence[LeagueSetting]) -> Iterator[Mapping]:
+    """
+    Generate sacko rows for the given league settings, the loser of the losers consolation ladder final.
+
+    :param league_settings: list of league settings
+    :return: generator of dicts of sackos column name to value, only for seasons with a decided final
+    """
+    for l in league_settings:
+        final = get_final_matchup_score(l, ms.LOSERS_CONSOLATION_LADDER)
+        if final is not None:
+            yield dict(league_id=l.league_id,
+                       year=l.season_id,
+                       owner_id=get_team_id_to_owner_id(l).get(final.losing_team_id))
 
 
 def get_matchups(league_settings: Sequence[LeagueSetting]) -> Sequence[Matchups]:
@@ -43,89 +269,109 @@ def get_matchups(league_settings: Sequence[LeagueSetting]) -> Sequence[Matchups]
     :param league_settings: list of league settings
     :return: list of matchups
     """
-    matchups = list()
+    return [Matchups(**row) for row in get_matchup_rows(league_settings)]
+
+
+def get_matchup_rows(league_settings: Sequence[LeagueSetting]) -> Iterator[Mapping]:
+    """
+    Generate matchup rows for the given league settings, without building ORM objects.
+
+    :param league_settings: list of league settings
+    :return: generator of dicts of matchups column name to value
+    """
     for league_setting in league_settings:
-        team_id_to_owner_ids = get_team_id_to_owner_id(league_setting.season_id)
+        team_id_to_owner_ids = get_team_id_to_owner_id(league_setting)
         for matchup_score in league_setting.matchup_scores:
-            add_matchups(league_setting=league_setting, matchups=matchups, matchup_score=matchup_score,
-                         team_id_to_owner_ids=team_id_to_owner_ids)
-
-    return matchups
+            yield from get_matchup_score_rows(league_setting=league_setting, matchup_score=matchup_score,
+                                              team_id_to_owner_ids=team_id_to_owner_ids)
 
 
-def add_matchups(league_setting: LeagueSetting, matchups: List[Matchups], matchup_score: MatchupScore,
-                 team_id_to_owner_ids: Mapping[int, List[str]]):
+def get_matchup_score_rows(league_setting: LeagueSetting, matchup_score: MatchupScore,
+                           team_id_to_owner_ids: Mapping[int, str]) -> List[Mapping]:
     """
-    Add two matchups for each matchup score, switching the home and away team attributes.
+    Get two matchup rows for each matchup score, switching the home and away team attributes.
 
     :param league_setting: the league setting
-    :param matchups: list of matchups
     :param matchup_score: the matchup score
     :param team_id_to_owner_ids: dict of team ID to owner IDs
-    :return: None
+    :return: list of dicts of matchups column name to value
     """
     owner_id = team_id_to_owner_ids.get(matchup_score.home_team_id)
     opponent_owner_id = team_id_to_owner_ids.get(matchup_score.away_team_id)
 
-    matchups.append(Matchups(year=league_setting.season_id,
-                             matchup_id=matchup_score.matchup_period_id,
-                             team_id=matchup_score.home_team_id,
-                             owner_id=owner_id,
-                             opponent_team_id=matchup_score.away_team_id,
-                             opponent_owner_id=opponent_owner_id,
-                             team_score=matchup_score.home_total_points,
-                             opponent_team_score=matchup_score.away_total_points,
-                             is_win=matchup_score.is_win,
-                             is_loss=matchup_score.is_loss,
-                             is_pending=matchup_score.is_pending,
-                             is_bye=matchup_score.is_bye,
-                             is_playoffs=matchup_score.is_playoffs,
-                             is_consolation=matchup_score.is_consolation))
+    rows = [dict(league_id=league_setting.league_id,
+                 year=league_setting.season_id,
+                 matchup_id=matchup_score.matchup_period_id,
+                 team_id=matchup_score.home_team_id,
+                 owner_id=owner_id,
+                 opponent_team_id=matchup_score.away_team_id,
+                 opponent_owner_id=opponent_owner_id,
+                 team_score=matchup_score.home_total_points,
+                 opponent_team_score=matchup_score.away_total_points,
+                 is_win=matchup_score.is_win,
+                 is_loss=matchup_score.is_loss,
+                 is_pending=matchup_score.is_pending,
+                 is_bye=matchup_score.is_bye,
+                 is_playoffs=matchup_score.is_playoffs,
+                 is_consolation=matchup_score.is_consolation)]
 
     if matchup_score.team_count > 1:
-        matchups.append(Matchups(year=league_setting.season_id,
-                                 matchup_id=matchup_score.matchup_period_id,
-                                 team_id=matchup_score.away_team_id,
-                                 owner_id=opponent_owner_id,
-                                 opponent_team_id=matchup_score.home_team_id,
-                                 opponent_owner_id=owner_id,
-                                 team_score=matchup_score.away_total_points,
-                                 opponent_team_score=matchup_score.home_total_points,
-                                 is_win=matchup_score.is_loss,
-                                 is_loss=matchup_score.is_win,
-                                 is_pending=matchup_score.is_pending,
-                                 is_bye=matchup_score.is_bye,
-                                 is_playoffs=matchup_score.is_playoffs,
-                                 is_consolation=matchup_score.is_consolation))
-
-
-def get_owners(league_settings: Sequence[LeagueSetting]) -> Mapping[str, Owners]:
+        rows.append(dict(league_id=league_setting.league_id,
+                         year=league_setting.season_id,
+                         matchup_id=matchup_score.matchup_period_id,
+                         team_id=matchup_score.away_team_id,
+                         owner_id=opponent_owner_id,
+                         opponent_team_id=matchup_score.home_team_id,
+                         opponent_owner_id=owner_id,
+                         team_score=matchup_score.away_total_points,
+                         opponent_team_score=matchup_score.home_total_points,
+                         is_win=matchup_score.is_loss,
+                         is_loss=matchup_score.is_win,
+                         is_pending=matchup_score.is_pending,
+                         is_bye=matchup_score.is_bye,
+                         is_playoffs=matchup_score.is_playoffs,
+                         is_consolation=matchup_score.is_consolation))
+
+    return rows
+
+
+def get_owners(league_settings: Sequence[LeagueSetting]) -> Mapping[Tuple[int, str], Owners]:
     """
     Get owners for the given league settings.
 
     :param league_settings: list of league settings
-    :return: list of owners
+    :return: dict of (league ID, username) to owner
     """
-    owners = dict()
+    return dict(((row["league_id"], row["username"]), Owners(**row)) for row in get_owner_rows(league_settings))
+
+
+def get_owner_rows(league_settings: Sequence[LeagueSetting]) -> Iterator[Mapping]:
+    """
+    Generate owner rows for the given league settings, once per league and username.
+
+    :param league_settings: list of league settings
+    :return: generator of dicts of owners column name to value
+    """
+    seen = set()
     for l in league_settings:
         for member in l.members:
-            if member.username not in owners:
-                owners[member.username] = Owners(id=member.id,
-                                                 username=member.username,
-                                                 first_name=member.first_name,
-                                                 last_name=member.last_name)
-    return owners
+            if (l.league_id, member.username) not in seen:
+                seen.add((l.league_id, member.username))
+                yield dict(league_id=l.league_id,
+                           id=member.id,
+                           username=member.username,
+                           first_name=member.first_name,
+                           last_name=member.last_name)
 
 
-def get_team_id_to_owner_id(year: int):
+def get_team_id_to_owner_id(league_setting: LeagueSetting) -> Mapping[int, str]:
     """
     Get a dict of team ID to owner IDs.
 
-    :param year: the year
+    :param league_setting: the league setting
     :return: dict of team ID to owner IDs
     """
-    teams = Teams.query.filter_by(year=year).all()
-    return dict((team.id, team.owner_id) for team in teams)
+    return dict((team.id, team.primary_owner) for team in league_setting.teams)
 
 
 def get_records_and_teams(league_settings: Sequence[LeagueSetting]) -> (Sequence[Records], Sequence[Teams]):
@@ -135,28 +381,48 @@ def get_records_and_teams(league_settings: Sequence[LeagueSetting]) -> (Sequence
     :param league_settings: list of league settings
     :return: tuple of records and teams
     """
-    teams = list()
-    records = list()
+    records = [Records(**row) for row in get_record_rows(league_settings)]
+    teams = [Teams(**row) for row in get_team_rows(league_settings)]
+    return records, teams
+
+
+def get_record_rows(league_settings: Sequence[LeagueSetting]) -> Iterator[Mapping]:
+    """
+    Generate record rows for the given league settings, without building ORM objects.
 
+    :param league_settings: list of league settings
+    :return: generator of dicts of records column name to value
+    """
     for l in league_settings:
         for team in l.teams:
             record = team.record
-            records.append(Records(year=l.season_id,
-                                   team_id=team.id,
-                                   owner_id=team.primary_owner,
-                                   standing=team.standing,
-                                   wins=record.wins,
-                                   losses=record.losses,
-                                   ties=record.ties,
-                                   points_for=round(record.points_for, 2),
-                                   points_against=round(record.points_against, 2),
-                                   streak_length=record.streak_length,
-                                   streak_type=record.streak_type))
-            teams.append(Teams(year=l.season_id,
-                               id=team.id,
-                               owner_id=team.primary_owner,
-                               abbreviation=team.abbrev,
-                               location=team.location,
-                               nickname=team.nickname))
+            yield dict(league_id=l.league_id,
+                       year=l.season_id,
+                       team_id=team.id,
+                       owner_id=team.primary_owner,
+                       standing=team.standing,
+                       wins=record.wins,
+                       losses=record.losses,
+                       ties=record.ties,
+                       points_for=round(record.points_for, 2),
+                       points_against=round(record.points_against, 2),
+                       streak_length=record.streak_length,
+                       streak_type=record.streak_type)
 
-    return records, teams
+
+def get_team_rows(league_settings: Sequence[LeagueSetting]) -> Iterator[Mapping]:
+    """
+    Generate team rows for the given league settings, without building ORM objects.
+
+    :param league_settings: list of league settings
+    :return: generator of dicts of teams column name to value
+    """
+    for l in league_settings:
+        for team in l.teams:
+            yield dict(league_id=l.league_id,
+                       year=l.season_id,
+                       id=team.id,
+                       owner_id=team.primary_owner,
+                       abbreviation=team.abbrev,
+                       location=team.location,
+                       nickname=team.nickname)
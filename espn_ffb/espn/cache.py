@@ -0,0 +1,283 @@
+import argparse
+from espn_ffb import util
+from espn_ffb.config import Config
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, List, Mapping, NamedTuple, Optional, Sequence, Type
+
+CACHE_FILE_EXTENSION = ".json.gz"
+# eviction frees space down to this fraction of the size limit, so the next puts do not evict again right away
+EVICT_TARGET_RATIO = 0.9
+
+
+class CacheEntry(NamedTuple):
+    key: str
+    path: str
+    size: int
+    meta: Mapping
+    data: Any
+
+
+def get_key(league_id: int, season_id: int, views: Sequence[str], extra: Any = None) -> str:
+    """
+    Get the cache key for a league, season and set of views.
+
+    :param league_id: the league ID
+    :param season_id: the season ID
+    :param views: the view names
+    :param extra: any other request parameters that change the response
+    :return: the hex digest cache key
+    """
+    identity = json.dumps([league_id, season_id, sorted(views), extra], sort_keys=True)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, directory: str, max_bytes: int, ttl: int):
+        """
+        Initialize an on-disk cache of raw ESPN responses.
+
+        Entries for past seasons are immutable and are served forever. Entries for the current season are served for
+        ttl seconds and then revalidated with the ETag/Last-Modified headers of the stored response.
+
+        :param directory: the cache directory
+        :param max_bytes: the maximum total size of the cache before the least recently used entries are evicted
+        :param ttl: the number of seconds a mutable entry is served without revalidation
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # running total size of the entries, computed from disk on first use and kept up to date by put and evict
+        self._total_bytes: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config: Type[Config]) -> Optional["ResponseCache"]:
+        """
+        Create a response cache for the given config.
+
+        :param config: the config object
+        :return: the response cache, or None if caching is disabled
+        """
+        if not config.CACHE_DIR:
+            return None
+        return cls(directory=config.CACHE_DIR, max_bytes=config.CACHE_MAX_BYTES, ttl=config.CACHE_TTL)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + CACHE_FILE_EXTENSION)
+
+    def get(self, key: str, touch: bool = True) -> Optional[CacheEntry]:
+        """
+        Get a cache entry.
+
+        :param key: the cache key
+        :param touch: mark the entry as recently used
+        :return: the cache entry, or None on a miss
+        """
+        path = self.get_path(key)
+        try:
+            entry = self._read(path)
+            if touch:
+                os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (KeyError, OSError, ValueError) as e:
+            logging.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            self._total_bytes = None
+            return None
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """
+        Check whether an entry can be served without revalidation.
+
+        :param entry: the cache entry
+        :return: True if the entry is immutable or younger than the TTL
+        """
+        return entry.meta.get("immutable") or time.time() - entry.meta.get("fetched_at") < self.ttl
+
+    def put(self, key: str, data: Any, meta: Mapping):
+        """
+        Store a response and evict the least recently used entries if it pushes the cache over its size limit.
+
+        The cache size is tracked as a running total, so the cache directory is only walked when entries have to be
+        evicted.
+
+        :param key: the cache key
+        :param data: the decoded JSON response
+        :param meta: dict of entry metadata, e.g. immutable, etag and last_modified
+        :return: None
+        """
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        payload = json.dumps({"meta": dict(meta, fetched_at=time.time()), "data": data}).encode("utf-8")
+        compressed = gzip.compress(payload)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(compressed)
+
+        with self._lock:
+            total_bytes = self.get_total_bytes() - self._get_size(path) + len(compressed)
+            os.replace(tmp_path, path)
+            self._total_bytes = total_bytes
+
+        if total_bytes > self.max_bytes:
+            self.evict()
+
+    def touch(self, key: str):
+        """
+        Mark a mutable entry as revalidated.
+
+        :param key: the cache key
+        :return: None
+        """
+        entry = self.get(key)
+        if entry:
+            self.put(key, entry.data, entry.meta)
+
+    def get_total_bytes(self) -> int:
+        """
+        Get the total size of the cache entries, walking the cache directory only the first time.
+
+        :return: the total size in bytes
+        """
+        if self._total_bytes is None:
+            self._total_bytes = sum(e.size for e in self.entries())
+        return self._total_bytes
+
+    def entries(self) -> List[CacheEntry]:
+        """
+        List all cache entries without their data, least recently used first.
+
+        :return: list of cache entries
+        """
+        entries = list()
+        if not os.path.isdir(self.directory):
+            return entries
+
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(CACHE_FILE_EXTENSION):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key = filename[:-len(CACHE_FILE_EXTENSION)]
+                entries.append((stat.st_mtime, CacheEntry(key, path, stat.st_size, dict(), None)))
+
+        return [entry for _, entry in sorted(entries)]
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used entries until the cache is within EVICT_TARGET_RATIO of its size limit.
+
+        :return: the number of entries removed
+        """
+        with self._lock:
+            entries = self.entries()
+            total = sum(e.size for e in entries)
+            removed = 0
+            for entry in entries:
+                if total <= self.max_bytes * EVICT_TARGET_RATIO:
+                    break
+                self._remove(entry.path)
+                total -= entry.size
+                removed += 1
+
+            self._total_bytes = total
+            if removed:
+                logging.info(f"Evicted {removed} cache entries")
+            return removed
+
+    def clear(self, mutable_only: bool = False) -> int:
+        """
+        Remove cache entries.
+
+        :param mutable_only: only remove entries for the current season
+        :return: the number of entries removed
+        """
+        removed = 0
+        for entry in self.entries():
+            if mutable_only:
+                cached = self.get(entry.key, touch=False)
+                if cached and cached.meta.get("immutable"):
+                    continue
+            self._remove(entry.path)
+            removed += 1
+        self._total_bytes = None
+        return removed
+
+    @staticmethod
+    def _read(path: str) -> CacheEntry:
+        with open(path, "rb") as f:
+            compressed = f.read()
+        payload = json.loads(gzip.decompress(compressed).decode("utf-8"))
+        key = os.path.basename(path)[:-len(CACHE_FILE_EXTENSION)]
+        return CacheEntry(key, path, len(compressed), payload["meta"], payload["data"])
+
+    @staticmethod
+    def _get_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def parse_args() -> Mapping:
+    """
+
+    :return: dict of parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Inspect and clear the ESPN response cache.")
+    parser.add_argument('-e', '--environment', help="The development environment", type=str, required=True,
+                        choices=util.SUPPORTED_ENVIRONMENTS)
+    parser.add_argument('command', help="The cache command", type=str, choices={"info", "clear", "evict"})
+    parser.add_argument('--mutable-only', help="Only clear entries for the current season", action="store_true")
+    return vars(parser.parse_args())
+
+
+def main():
+    args = parse_args()
+    config = util.get_config(args.get("environment"))
+    cache = ResponseCache.from_config(config)
+    if cache is None:
+        print("Response cache is disabled")
+        return
+
+    command = args.get("command")
+    if command == "info":
+        entries = cache.entries()
+        for entry in entries:
+            cached = cache.get(entry.key, touch=False)
+            if cached is None:
+                continue
+            meta = cached.meta
+            print(f"{entry.key[:12]}  league={meta.get('league_id')} season={meta.get('season_id')} "
+                  f"views={','.join(meta.get('views', []))} immutable={meta.get('immutable')} size={entry.size}")
+        print(f"{len(entries)} entries, {sum(e.size for e in entries)} bytes in {cache.directory} "
+              f"(limit {cache.max_bytes} bytes)")
+    elif command == "clear":
+        print(f"Removed {cache.clear(mutable_only=args.get('mutable_only'))} entries")
+    elif command == "evict":
+        print(f"Evicted {cache.evict()} entries")
+
+
+if __name__ == "__main__":
+    main()
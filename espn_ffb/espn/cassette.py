@@ -0,0 +1,133 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Mapping, Optional
+import zipfile
+
+RECORD = "record"
+REPLAY = "replay"
+INDEX_NAME = "index.json"
+
+
+class CassetteError(Exception):
+    pass
+
+
+def get_key(url: str, params: Any = None, headers: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Get the cassette key for a request.
+
+    :param url: the URL
+    :param params: query parameters, as a dict or a list of key/value tuples
+    :param headers: request headers that change the response
+    :return: the hex digest cassette key
+    """
+    if isinstance(params, Mapping):
+        params = params.items()
+    params = sorted([str(k), str(v)] for k, v in (params or []))
+    identity = json.dumps([url, params, sorted((headers or {}).items())])
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str):
+        """
+        Initialize a cassette, a compressed archive of ESPN responses.
+
+        In record mode every response is kept in memory and written to the archive on close. In replay mode responses
+        are served from the archive and a request that was never recorded raises a CassetteError.
+
+        :param path: the archive path
+        :param mode: either record or replay
+        """
+        if mode not in {RECORD, REPLAY}:
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._responses: Dict[str, Any] = dict()
+        self._index: Dict[str, Mapping] = dict()
+        self._archive = None
+
+        if mode == REPLAY:
+            self._archive = zipfile.ZipFile(path, "r")
+            self._index = json.loads(self._archive.read(INDEX_NAME))
+            logging.info(f"Replaying {len(self._index)} responses from {path}")
+
+    @classmethod
+    def from_args(cls, args: Mapping) -> Optional["Cassette"]:
+        """
+        Create a cassette from the parsed --record/--replay arguments.
+
+        :param args: dict of parsed arguments
+        :return: the cassette, or None if neither argument was given
+        """
+        if args.get("record"):
+            return cls(args.get("record"), RECORD)
+        if args.get("replay"):
+            return cls(args.get("replay"), REPLAY)
+        return None
+
+    @property
+    def is_replay(self) -> bool:
+        return self.mode == REPLAY
+
+    def get(self, url: str, params: Any = None, headers: Optional[Mapping[str, str]] = None) -> Any:
+        """
+        Get a recorded response.
+
+        :param url: the URL
+        :param params: query parameters
+        :param headers: request headers that change the response
+        :return: the decoded JSON response
+        """
+        key = get_key(url, params, headers)
+        with self._lock:
+            if key not in self._index:
+                raise CassetteError(f"No recorded response for {url} {params} in {self.path}")
+            return json.loads(self._archive.read(key + ".json"))
+
+    def put(self, url: str, data: Any, params: Any = None, headers: Optional[Mapping[str, str]] = None):
+        """
+        Record a response.
+
+        :param url: the URL
+        :param data: the decoded JSON response
+        :param params: query parameters
+        :param headers: request headers that change the response
+        :return: None
+        """
+        key = get_key(url, params, headers)
+        with self._lock:
+            self._responses[key] = data
+            self._index[key] = {"url": url, "params": repr(params), "headers": dict(headers or {})}
+
+    def close(self):
+        if self.mode == REPLAY:
+            self._archive.close()
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(INDEX_NAME, json.dumps(self._index))
+            for key, data in self._responses.items():
+                archive.writestr(key + ".json", json.dumps(data))
+        logging.info(f"Recorded {len(self._responses)} responses to {self.path}")
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Add the mutually exclusive --record and --replay arguments to a parser.
+
+    :param parser: the argument parser
+    :return: None
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', help="Record every ESPN response to this cassette archive", type=str)
+    group.add_argument('--replay', help="Serve every ESPN response from this cassette archive", type=str)
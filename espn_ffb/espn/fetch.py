@@ -0,0 +1,179 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from espn_ffb.config import Config
+from espn_ffb.espn.cache import ResponseCache
+from espn_ffb.espn.cassette import Cassette
+from espn_ffb.espn.throttle import RequestScheduler
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Mapping, Optional, Type
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+class Fetcher:
+    def __init__(self, cookies: Optional[Mapping[str, str]] = None, max_workers: int = 8,
+                 cache: Optional[ResponseCache] = None, cassette: Optional[Cassette] = None,
+                 scheduler: Optional[RequestScheduler] = None):
+        """
+        Initialize a fetcher with a shared keep-alive connection pool and a bounded worker pool.
+
+        :param cookies: dict of cookies sent with every request
+        :param max_workers: the maximum number of concurrent requests
+        :param cache: the on-disk response cache, if any
+        :param cassette: the cassette to record responses to or replay responses from, if any
+        :param scheduler: the request scheduler that throttles and retries requests
+        """
+        self.cookies = dict(cookies or {})
+        self.max_workers = max_workers
+        self.cache = cache
+        self.cassette = cassette
+        self.scheduler = scheduler or RequestScheduler.from_config(Config)
+
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.cookies.update(self.cookies)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="espn-fetch")
+
+    @classmethod
+    def from_config(cls, config: Type[Config], cassette: Optional[Cassette] = None) -> "Fetcher":
+        """
+        Create a fetcher for the given config.
+
+        :param config: the config object
+        :param cassette: the cassette to record responses to or replay responses from, if any
+        :return: the fetcher
+        """
+        return cls(cookies=config.COOKIES, max_workers=config.FETCH_MAX_WORKERS,
+                   cache=ResponseCache.from_config(config), cassette=cassette,
+                   scheduler=RequestScheduler.from_config(config))
+
+    def get_json(self, url: str, params: Any = None, headers: Optional[Mapping[str, str]] = None,
+                 cache_key: Optional[str] = None, cache_meta: Optional[Mapping] = None) -> Any:
+        """
+        Fetch a URL over the shared session and decode the JSON response.
+
+        When a cache key is given, a fresh cached response is returned without a request, and a stale one is
+        revalidated with a conditional request. When replaying a cassette, no request is made at all.
+
+        :param url: the URL
+        :param params: query parameters, as a dict or a list of key/value tuples
+        :param headers: request headers, e.g. X-Fantasy-Filter
+        :param cache_key: the response cache key, or None to bypass the cache
+        :param cache_meta: dict of cache entry metadata, e.g. immutable
+        :return: the decoded JSON response
+        """
+        if self.cassette and self.cassette.is_replay:
+            return self.cassette.get(url, params, headers)
+
+        data = self._get_json(url, params=params, headers=dict(headers or {}), cache_key=cache_key,
+                              cache_meta=cache_meta)
+        if self.cassette:
+            self.cassette.put(url, data, params, headers)
+        return data
+
+    def _get_json(self, url: str, params: Any, headers: Mapping[str, str], cache_key: Optional[str],
+                  cache_meta: Optional[Mapping]) -> Any:
+        if self.cache is None or cache_key is None:
+            logging.debug(f"Fetching {url} {params}")
+            return self.scheduler.get(self.session, url, params=params, headers=headers).json()
+
+        entry = self.cache.get(cache_key)
+        if entry and self.cache.is_fresh(entry):
+            logging.debug(f"Cache hit for {url} {params}")
+            return entry.data
+
+        if entry and entry.meta.get("etag"):
+            headers["If-None-Match"] = entry.meta.get("etag")
+        if entry and entry.meta.get("last_modified"):
+            headers["If-Modified-Since"] = entry.meta.get("last_modified")
+
+        logging.debug(f"Fetching {url} {params}")
+        response = self.scheduler.get(self.session, url, params=params, headers=headers)
+        if entry and response.status_code == requests.codes.not_modified:
+            self.cache.touch(cache_key)
+            return entry.data
+
+        data = response.json()
+        meta = dict(cache_meta or {},
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"))
+        self.cache.put(cache_key, data, meta)
+        return data
+
+    @property
+    def stats(self) -> Mapping[str, float]:
+        return self.scheduler.stats.snapshot()
+
+    def map(self, fn: Callable, items: Iterable) -> List:
+        """
+        Apply a function to each item on the worker pool.
+
+        :param fn: the function to apply
+        :param items: the items
+        :return: list of results, in the same order as the items
+        """
+        return list(self._executor.map(fn, items))
+
+    def imap(self, fn: Callable, items: Iterable, window: Optional[int] = None) -> Iterator:
+        """
+        Lazily apply a function to each item on the worker pool, with at most a window of items in flight.
+
+        The next item is only submitted once the caller has taken a result, so a slow consumer holds back the requests
+        instead of results piling up in memory.
+
+        :param fn: the function to apply, which must not itself wait on the worker pool
+        :param items: the items
+        :param window: the most items in flight, defaults to the number of workers
+        :return: generator of results, in the same order as the items
+        """
+        window = window or self.max_workers
+        pending = deque()
+        for item in items:
+            pending.append(self._executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def set_fetcher(fetcher: Fetcher):
+    """
+    Replace the process-wide fetcher, e.g. with one that records or replays a cassette.
+
+    :param fetcher: the fetcher
+    :return: None
+    """
+    global _fetcher
+    with _fetcher_lock:
+        _fetcher = fetcher
+
+
+def get_fetcher(config: Type[Config]) -> Fetcher:
+    """
+    Get the process-wide fetcher, creating it for the given config on first use.
+
+    :param config: the config object
+    :return: the fetcher
+    """
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = Fetcher.from_config(config)
+        return _fetcher
@@ -0,0 +1,59 @@
+from espn_ffb import util
+import pprint
+from typing import Mapping, Optional, Tuple
+
+
+class Model:
+    """
+    Base class of the ESPN models.
+
+    A subclass lists its plain fields in FIELDS, a dict of attribute name to JSON key, and declares __slots__ for them
+    and any derived attributes. The fields are copied out of the JSON dict in one pass over the precompiled field map,
+    and the JSON dict itself is only kept when keep_data is set, so a parsed season does not pin its raw payload.
+    """
+    __slots__ = ("_data",)
+
+    FIELDS: Mapping[str, str] = dict()
+    _FIELD_ITEMS: Tuple[Tuple[str, str], ...] = tuple()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_ITEMS = tuple(cls.FIELDS.items())
+
+    def __init__(self, data: Mapping, keep_data: bool = False):
+        """
+        Initialize the model's fields from a given dict.
+
+        :param data: dict of attributes to values
+        :param keep_data: keep a reference to the dict, e.g. for debugging with print_attributes
+        """
+        self._data: Optional[Mapping] = data if keep_data else None
+
+        get = data.get
+        for attr, key in self._FIELD_ITEMS:
+            setattr(self, attr, get(key))
+
+    def get_attributes(self) -> Mapping:
+        """
+        Get the model's attributes.
+
+        :return: dict of attribute name to value
+        """
+        attributes = dict()
+        for cls in reversed(type(self).__mro__):
+            for attr in getattr(cls, "__slots__", ()):
+                if attr != "_data" and hasattr(self, attr):
+                    attributes[attr] = getattr(self, attr)
+        return attributes
+
+    def __str__(self):
+        return ', '.join("%s: %s" % item for item in self.get_attributes().items())
+
+    def print_attributes(self):
+        if self._data is None:
+            raise ValueError(f"{type(self).__name__} was parsed without keep_data, the raw data is not available")
+        util.print_attributes(self._data)
+
+    @property
+    def data(self):
+        return pprint.pformat(self._data)
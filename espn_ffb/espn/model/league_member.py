@@ -1,17 +1,14 @@
-from espn_ffb import util
-
-
-class LeagueMember:
-    def __init__(self, json):
-        self.json = json
-
-        self.first_name = self.json.get("firstName")
-        self.last_name = self.json.get("lastName")
-        self.is_league_creator = self.json.get("isLeagueCreator")
-        self.invite_id = self.json.get("inviteId")
-        self.user_profile_id = self.json.get("userProfileId")
-        self.is_league_manager = self.json.get("isLeagueManager")
-        self.username = self.json.get("userName")
-
-    def print_attributes(self):
-        util.print_attributes(self.json)
+from espn_ffb.espn.model.base import Model
+
+
+class LeagueMember(Model):
+    FIELDS = {
+        "first_name": "firstName",
+        "last_name": "lastName",
+        "is_league_creator": "isLeagueCreator",
+        "invite_id": "inviteId",
+        "user_profile_id": "userProfileId",
+        "is_league_manager": "isLeagueManager",
+        "username": "userName",
+    }
+    __slots__ = tuple(FIELDS)
@@ -1,10 +1,20 @@
 from espn_ffb import util
 from espn_ffb.config import Config
+from espn_ffb.espn import cache
+from espn_ffb.espn.fetch import Fetcher, get_fetcher
 from espn_ffb.espn.model.matchup_score import MatchupScore
 from espn_ffb.espn.model.member import Member
 from espn_ffb.espn.model.team import Team
-import requests
-from typing import Type
+import json
+from typing import Mapping, Optional, Sequence, Type
+
+
+MATCHUP_SCORE_VIEW = "mMatchupScore"
+SETTINGS_VIEW = "mSettings"
+STATUS_VIEW = "mStatus"
+TEAM_VIEW = "mTeam"
+VIEWS = (MATCHUP_SCORE_VIEW, SETTINGS_VIEW, TEAM_VIEW)
+FANTASY_FILTER_HEADER = "X-Fantasy-Filter"
 
 
 def get_base_url(league_id: int, season_id: int, is_current_year: bool):
@@ -14,47 +24,117 @@ def get_base_url(league_id: int, season_id: int, is_current_year: bool):
         return f"https://fantasy.espn.com/apis/v3/games/ffl/leagueHistory/{league_id}?seasonId={season_id}"
 
 
-class LeagueSetting:
-    def __init__(self, config: Type[Config], year: int):
-        """
-        Initialize league settings for a given year.
+def get_view_data(fetcher: Fetcher, config: Type[Config], year: int, view: str,
+                  matchup_period_ids: Optional[Sequence[int]] = None, use_cache: bool = True) -> Mapping:
+    """
+    Fetch a single view of the league for a given year.
 
-        :param config: the config object
-        :param year: the year
-        """
+    :param fetcher: the fetcher
+    :param config: the config object
+    :param year: the year
+    :param view: the view name, e.g. mMatchupScore
+    :param matchup_period_ids: limit the schedule to these matchup periods, or None for the whole season
+    :param use_cache: serve the response from the response cache when possible
+    :return: dict of the view data
+    """
+    return get_league_data(fetcher=fetcher, config=config, year=year, views=[view],
+                           matchup_period_ids=matchup_period_ids, use_cache=use_cache)
+
+
+def get_matchup_period_filter(matchup_period_ids: Sequence[int]) -> str:
+    """
+    Get an X-Fantasy-Filter header value that limits the schedule to the given matchup periods.
+
+    :param matchup_period_ids: the matchup period IDs
+    :return: the JSON filter
+    """
+    return json.dumps({"schedule": {"filterMatchupPeriodIds": {"value": list(matchup_period_ids)}}})
+
+
+def get_league_data(fetcher: Fetcher, config: Type[Config], year: int, views: Sequence[str] = VIEWS,
+                    matchup_period_ids: Optional[Sequence[int]] = None, use_cache: bool = True) -> Mapping:
+    """
+    Fetch several views of the league for a given year in a single request.
+
+    :param fetcher: the fetcher
+    :param config: the config object
+    :param year: the year
+    :param views: the view names
+    :param matchup_period_ids: limit the schedule to these matchup periods, or None for the whole season
+    :param use_cache: serve the response from the response cache when possible
+    :return: dict of the combined view data
+    """
+    is_current_year = util.get_is_current_year(current_year=config.CURRENT_YEAR, season_id=year)
+    base_url = get_base_url(league_id=config.LEAGUE_ID, season_id=year, is_current_year=is_current_year)
 
-        _is_current_year = util.get_is_current_year(current_year=config.CURRENT_YEAR, season_id=year)
-        _base_url = get_base_url(league_id=config.LEAGUE_ID, season_id=year, is_current_year=_is_current_year)
+    headers = dict()
+    if matchup_period_ids:
+        headers[FANTASY_FILTER_HEADER] = get_matchup_period_filter(matchup_period_ids)
 
-        # fetch matchup scores data
-        _matchup_scores_data = requests.get(_base_url,
-                                            params="view=mMatchupScore",
-                                            cookies=config.COOKIES).json()
+    cache_meta = dict(league_id=config.LEAGUE_ID, season_id=year, views=list(views), immutable=not is_current_year)
+    cache_key = None
+    if use_cache:
+        cache_key = cache.get_key(league_id=config.LEAGUE_ID, season_id=year, views=views,
+                                  extra=headers.get(FANTASY_FILTER_HEADER))
+    data = fetcher.get_json(base_url,
+                            params=[("view", view) for view in views],
+                            headers=headers,
+                            cache_key=cache_key,
+                            cache_meta=cache_meta)
+    if not is_current_year:
+        data = data[0]
+    return data
 
-        # fetch settings data
-        _settings_data = requests.get(_base_url,
-                                      params="view=mSettings",
-                                      cookies=config.COOKIES).json()
 
-        # fetch team data
-        _team_data = requests.get(_base_url,
-                                  params="view=mTeam",
-                                  cookies=config.COOKIES).json()
+def merge_view_data(view_data: Mapping[str, Mapping]) -> Mapping:
+    """
+    Merge separately fetched views into the same shape as a combined multi-view response.
 
-        if not _is_current_year:
-            _matchup_scores_data = _matchup_scores_data[0]
-            _settings_data = _settings_data[0]
-            _team_data = _team_data[0]
+    :param view_data: dict of view name to view data
+    :return: dict of the combined view data
+    """
+    data = dict(view_data[SETTINGS_VIEW])
+    data["schedule"] = view_data[MATCHUP_SCORE_VIEW].get("schedule")
+    data["members"] = view_data[TEAM_VIEW].get("members")
+    data["teams"] = view_data[TEAM_VIEW].get("teams")
+    return data
 
-        self.matchup_scores = [MatchupScore(matchup_score) for matchup_score in _matchup_scores_data.get("schedule")]
-        self.members = [Member(member) for member in _team_data.get("members")]
+
+class LeagueSetting:
+    def __init__(self, data: Mapping, keep_data: bool = False):
+        """
+        Initialize league settings from already-fetched league data.
+
+        :param data: dict of the combined mMatchupScore, mSettings and mTeam view data
+        :param keep_data: keep the raw data of every parsed model, e.g. for debugging
+        """
+        schedule_settings = data['settings']['scheduleSettings']
+
+        self.league_id = data.get("id")
+        self.matchup_scores = [MatchupScore(matchup_score, keep_data) for matchup_score in data.get("schedule")]
+        self.members = [Member(member, keep_data) for member in data.get("members")]
         self.owner_ids = {member.id for member in self.members}
-        self.playoff_matchup_length = _settings_data['settings']['scheduleSettings']['playoffMatchupPeriodLength']
-        self.playoff_team_count = _settings_data['settings']['scheduleSettings']['playoffTeamCount']
-        self.regular_season_matchup_count = _settings_data['settings']['scheduleSettings']['matchupPeriodCount']
-        self.regular_season_matchup_length = _settings_data['settings']['scheduleSettings']['matchupPeriodLength']
-        self.season_id = _settings_data.get("seasonId")
-        self.teams = [Team(team) for team in _team_data.get("teams")]
+        self.playoff_matchup_length = schedule_settings['playoffMatchupPeriodLength']
+        self.playoff_team_count = schedule_settings['playoffTeamCount']
+        self.regular_season_matchup_count = schedule_settings['matchupPeriodCount']
+        self.regular_season_matchup_length = schedule_settings['matchupPeriodLength']
+        # each playoff round is one matchup period, and byes round the bracket up to a power of two
+        self.final_matchup_period_id = self.regular_season_matchup_count + (self.playoff_team_count - 1).bit_length()
+        self.season_id = data.get("seasonId")
+        self.teams = [Team(team, keep_data) for team in data.get("teams")]
+
+    @classmethod
+    def fetch(cls, config: Type[Config], year: int, fetcher: Optional[Fetcher] = None) -> "LeagueSetting":
+        """
+        Fetch and initialize league settings for a given year.
+
+        :param config: the config object
+        :param year: the year
+        :param fetcher: the fetcher, defaults to the process-wide fetcher
+        :return: the league settings
+        """
+        fetcher = fetcher or get_fetcher(config)
+        return cls(get_league_data(fetcher=fetcher, config=config, year=year), keep_data=config.KEEP_RAW_DATA)
 
     def __str__(self):
         return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
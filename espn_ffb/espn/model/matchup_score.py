@@ -1,26 +1,50 @@
 from decimal import Decimal
-from espn_ffb import util
-import pprint
-from typing import Mapping
+from espn_ffb.espn.model.base import Model
+from typing import Mapping, Optional
 
+AWAY = "AWAY"
+HOME = "HOME"
+LOSERS_CONSOLATION_LADDER = "LOSERS_CONSOLATION_LADDER"
+UNDECIDED = "UNDECIDED"
+WINNERS_BRACKET = "WINNERS_BRACKET"
+WINNERS_CONSOLATION_LADDER = "WINNERS_CONSOLATION_LADDER"
 
-class MatchupScore:
-    def __init__(self, data: Mapping):
-        """
-        Initialize team for a given dict.
+CONSOLATION_LADDER = {LOSERS_CONSOLATION_LADDER, WINNERS_CONSOLATION_LADDER}
 
-        :param data: dict of team attributes to values
-        """
-        AWAY = "AWAY"
-        HOME = "HOME"
-        LOSERS_CONSOLATION_LADDER = "LOSERS_CONSOLATION_LADDER"
-        UNDECIDED = "UNDECIDED"
-        WINNERS_BRACKET = "WINNERS_BRACKET"
-        WINNERS_CONSOLATION_LADDER = "WINNERS_CONSOLATION_LADDER"
 
-        CONSOLATION_LADDER = {LOSERS_CONSOLATION_LADDER, WINNERS_CONSOLATION_LADDER}
+class MatchupScore(Model):
+    FIELDS = {
+        "id": "id",
+        "matchup_period_id": "matchupPeriodId",
+        "playoff_tier_type": "playoffTierType",
+        "winner": "winner",
+    }
+    __slots__ = tuple(FIELDS) + (
+        "team_count",
+        "away_adjustment",
+        "away_team_id",
+        "away_tie_break",
+        "away_total_points",
+        "home_adjustment",
+        "home_team_id",
+        "home_tie_break",
+        "home_total_points",
+        "is_bye",
+        "is_consolation",
+        "is_loss",
+        "is_pending",
+        "is_playoffs",
+        "is_win",
+    )
+
+    def __init__(self, data: Mapping, keep_data: bool = False):
+        """
+        Initialize matchup score for a given dict.
 
-        self._data = data
+        :param data: dict of matchup score attributes to values
+        :param keep_data: keep a reference to the dict, e.g. for debugging
+        """
+        super().__init__(data, keep_data)
 
         self.team_count = 0
         self.away_adjustment = None
@@ -32,26 +56,21 @@ class MatchupScore:
         self.home_tie_break = None
         self.home_total_points = None
 
-        self.away = self._data.get("away")
-        if self.away is not None:
+        away = data.get("away")
+        if away is not None:
             self.team_count += 1
-            self.away_adjustment = self.away.get("adjustment")
-            self.away_team_id = self.away.get("teamId")
-            self.away_tie_break = self.away.get("tiebreak")
-            self.away_total_points = round(Decimal(self.away.get("totalPoints")), 2)
+            self.away_adjustment = away.get("adjustment")
+            self.away_team_id = away.get("teamId")
+            self.away_tie_break = away.get("tiebreak")
+            self.away_total_points = round(Decimal(away.get("totalPoints")), 2)
 
-        self.home = self._data.get("home")
-        if self.home is not None:
+        home = data.get("home")
+        if home is not None:
             self.team_count += 1
-            self.home_adjustment = self.home.get("adjustment")
-            self.home_team_id = self.home.get("teamId")
-            self.home_tie_break = self.home.get("tiebreak")
-            self.home_total_points = round(Decimal(self.home.get("totalPoints")), 2)
-
-        self.id = self._data.get("id")
-        self.matchup_period_id = self._data.get("matchupPeriodId")
-        self.playoff_tier_type = self._data.get("playoffTierType")
-        self.winner = self._data.get("winner")
+            self.home_adjustment = home.get("adjustment")
+            self.home_team_id = home.get("teamId")
+            self.home_tie_break = home.get("tiebreak")
+            self.home_total_points = round(Decimal(home.get("totalPoints")), 2)
 
         self.is_bye = self.winner == UNDECIDED and self.playoff_tier_type == WINNERS_BRACKET
         self.is_consolation = self.playoff_tier_type in CONSOLATION_LADDER
@@ -60,12 +79,10 @@ class MatchupScore:
         self.is_playoffs = self.playoff_tier_type == WINNERS_BRACKET
         self.is_win = self.winner == HOME
 
-    def __str__(self):
-        return ', '.join("%s: %s" % item for item in vars(self).items() if "_json" not in item)
-
-    def print_attributes(self):
-        util.print_attributes(self._data)
+    @property
+    def winning_team_id(self) -> Optional[int]:
+        return {HOME: self.home_team_id, AWAY: self.away_team_id}.get(self.winner)
 
     @property
-    def data(self):
-        return pprint.pformat(self._data)
+    def losing_team_id(self) -> Optional[int]:
+        return {HOME: self.away_team_id, AWAY: self.home_team_id}.get(self.winner)
@@ -0,0 +1,250 @@
+from espn_ffb.config import Config
+import logging
+import random
+import requests
+import threading
+import time
+from typing import Dict, Mapping, Optional, Type
+from urllib.parse import urlparse
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a token bucket that allows bursts of capacity requests and rate requests per second after that.
+
+        :param rate: the number of tokens added per second
+        :param capacity: the maximum number of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available and take it.
+
+        :return: None
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Stop handing out tokens for the given number of seconds, e.g. after a Retry-After header.
+
+        :param seconds: the number of seconds
+        :return: None
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+class AdaptiveLimiter:
+    def __init__(self, min_limit: int, max_limit: int, target_latency: float):
+        """
+        Initialize a concurrency limiter that adjusts its limit with additive increase and multiplicative decrease.
+
+        The limit grows while requests succeed within the target latency, shrinks slowly while they are slower, and is
+        halved on every throttled or failed request.
+
+        :param min_limit: the minimum number of concurrent requests
+        :param max_limit: the maximum number of concurrent requests
+        :param target_latency: the latency in seconds above which the limit stops growing
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.limit = float(max_limit)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, is_error: bool):
+        """
+        Release a slot and adjust the limit from the outcome of the request.
+
+        :param latency: the request latency in seconds
+        :param is_error: True if the request was throttled or failed
+        :return: None
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if is_error:
+                self.limit = max(self.min_limit, self.limit / 2)
+            elif latency <= self.target_latency:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit - 1 / self.limit)
+            self._condition.notify_all()
+
+
+class FetchStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.connection_errors = 0
+        self.failures = 0
+        self.latency = 0.0
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Mapping[str, float]:
+        """
+        Get the current counters.
+
+        :return: dict of counter name to value, plus the average latency and throughput
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'server_errors': self.server_errors,
+                'connection_errors': self.connection_errors,
+                'failures': self.failures,
+                'avg_latency': round(self.latency / self.requests, 3) if self.requests else 0.0,
+                'requests_per_second': round(self.requests / elapsed, 3) if elapsed else 0.0,
+            }
+
+
+class RequestScheduler:
+    def __init__(self, rate: float, burst: float, min_concurrency: int, max_concurrency: int, target_latency: float,
+                 max_retries: int, backoff_base: float, backoff_max: float, timeout: float):
+        """
+        Initialize a request scheduler with per-host token buckets, adaptive concurrency and retries.
+
+        :param rate: the number of requests per second allowed per host
+        :param burst: the number of requests allowed in a burst per host
+        :param min_concurrency: the minimum number of concurrent requests
+        :param max_concurrency: the maximum number of concurrent requests
+        :param target_latency: the latency in seconds above which concurrency stops growing
+        :param max_retries: the number of retries of a throttled or failed request
+        :param backoff_base: the base of the exponential backoff in seconds
+        :param backoff_max: the maximum backoff in seconds
+        :param timeout: the request timeout in seconds
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.limiter = AdaptiveLimiter(min_limit=min_concurrency, max_limit=max_concurrency,
+                                       target_latency=target_latency)
+        self.stats = FetchStats()
+        self._buckets: Dict[str, TokenBucket] = dict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Type[Config]) -> "RequestScheduler":
+        return cls(rate=config.FETCH_RATE, burst=config.FETCH_BURST, min_concurrency=config.FETCH_MIN_WORKERS,
+                   max_concurrency=config.FETCH_MAX_WORKERS, target_latency=config.FETCH_TARGET_LATENCY,
+                   max_retries=config.FETCH_MAX_RETRIES, backoff_base=config.FETCH_BACKOFF_BASE,
+                   backoff_max=config.FETCH_BACKOFF_MAX, timeout=config.FETCH_TIMEOUT)
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(rate=self.rate, capacity=self.burst)
+            return self._buckets[host]
+
+    def get_backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """
+        Get the number of seconds to wait before retrying, with full jitter, honoring any Retry-After header.
+
+        :param attempt: the zero-based attempt number
+        :param response: the failed response, or None on a connection error
+        :return: the backoff in seconds
+        """
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            backoff = max(backoff, min(self.backoff_max, float(retry_after)))
+        return backoff
+
+    def get(self, session: requests.Session, url: str, **kwargs) -> requests.Response:
+        """
+        Send a GET request, retrying throttled, 5xx and connection-failed requests with jittered backoff.
+
+        :param session: the session
+        :param url: the URL
+        :param kwargs: the request arguments
+        :return: the response
+        :raises requests.HTTPError: if the response is still an error after all retries
+        """
+        bucket = self.get_bucket(url)
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            self.limiter.acquire()
+            started_at = time.monotonic()
+            response, error = None, None
+            try:
+                response = session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                latency = time.monotonic() - started_at
+                is_error = response is None or response.status_code in RETRY_STATUS_CODES
+                self.limiter.release(latency=latency, is_error=is_error)
+
+            self.stats.add(requests=1, latency=latency,
+                           throttled=int(response is not None and response.status_code == 429),
+                           server_errors=int(response is not None and response.status_code >= 500),
+                           connection_errors=int(error is not None))
+            if not is_error:
+                break
+
+            if attempt == self.max_retries:
+                self.stats.add(failures=1)
+                if error is not None:
+                    raise error
+                break
+
+            backoff = self.get_backoff(attempt=attempt, response=response)
+            if response is not None and response.status_code == 429:
+                bucket.pause(backoff)
+            logging.warning(f"Retrying {url} in {backoff:.2f}s after "
+                            f"{error or response.status_code} (attempt {attempt + 1}/{self.max_retries})")
+            self.stats.add(retries=1)
+            time.sleep(backoff)
+
+        if response.status_code >= 400:
+            if response.status_code not in RETRY_STATUS_CODES:
+                self.stats.add(failures=1)
+            response.raise_for_status()
+        return response
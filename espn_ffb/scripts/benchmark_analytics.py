@@ -0,0 +1,162 @@
+import argparse
+from collections import defaultdict
+from decimal import Decimal
+from espn_ffb.db import analytics
+from espn_ffb.db.model.matchups import Matchups
+import random
+import time
+from typing import Callable, List, Mapping, Sequence, Tuple
+
+CENTS = Decimal(100)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks the NumPy head-to-head records and streaks of "
+                                                 "Query.get_h2h_summaries against walking matchup objects.")
+    parser.add_argument('-s', '--seasons', help="The number of seasons", type=int, default=30)
+    parser.add_argument('-t', '--teams', help="The number of teams per season", type=int, default=14)
+    parser.add_argument('-w', '--weeks', help="The number of regular season matchup periods", type=int, default=14)
+    parser.add_argument('-r', '--repeat', help="The number of timed runs", type=int, default=5)
+    return vars(parser.parse_args())
+
+
+def get_score() -> Decimal:
+    # whole scores now and then, so some matchups are ties
+    if random.random() < 0.05:
+        return Decimal(100)
+    return Decimal(random.randint(6000, 16000)) / CENTS
+
+
+def get_matchup_rows(year: int, matchup_id: int, pairs: Sequence[Tuple[int, int]], team_id_to_owner_id: Mapping,
+                     is_playoffs: bool = False, is_consolation: bool = False,
+                     is_pending: bool = False) -> List[Mapping]:
+    rows = list()
+    for team_id, opponent_team_id in pairs:
+        team_score, opponent_team_score = get_score(), get_score()
+        for t, o, ts, os in ((team_id, opponent_team_id, team_score, opponent_team_score),
+                             (opponent_team_id, team_id, opponent_team_score, team_score)):
+            rows.append(dict(league_id=123456, year=year, matchup_id=matchup_id, team_id=t,
+                             owner_id=team_id_to_owner_id[t], opponent_team_id=o,
+                             opponent_owner_id=team_id_to_owner_id[o], team_score=ts, opponent_team_score=os,
+                             is_win=not is_pending and ts > os, is_loss=not is_pending and ts < os,
+                             is_pending=is_pending, is_bye=False, is_playoffs=is_playoffs,
+                             is_consolation=is_consolation))
+    return rows
+
+
+def get_history(season_count: int, team_count: int, week_count: int) -> List[Mapping]:
+    """
+    Generate the matchup rows of a synthetic league history, with owners coming and going between seasons, two
+    playoff byes, consolation games and a pending final week.
+
+    :param season_count: the number of seasons
+    :param team_count: the number of teams per season
+    :param week_count: the number of regular season matchup periods
+    :return: list of dicts of matchups column name to value
+    """
+    owner_pool = [f"{{OWNER-{i}}}" for i in range(team_count + season_count // 3)]
+    rows = list()
+    for year in range(2000, 2000 + season_count):
+        team_ids = list(range(1, team_count + 1))
+        team_id_to_owner_id = dict(zip(team_ids, random.sample(owner_pool, team_count)))
+        for matchup_id in range(1, week_count + 1):
+            random.shuffle(team_ids)
+            rows += get_matchup_rows(year, matchup_id, list(zip(team_ids[::2], team_ids[1::2])),
+                                     team_id_to_owner_id)
+
+        seeds = random.sample(team_ids, team_count)
+        playoff_week = week_count + 1
+        for bye_team_id in seeds[:2]:
+            rows.append(dict(league_id=123456, year=year, matchup_id=playoff_week, team_id=bye_team_id,
+                             owner_id=team_id_to_owner_id[bye_team_id], opponent_team_id=None,
+                             opponent_owner_id=None, team_score=Decimal(0), opponent_team_score=None, is_win=False,
+                             is_loss=False, is_pending=False, is_bye=True, is_playoffs=True, is_consolation=False))
+        rows += get_matchup_rows(year, playoff_week, [(seeds[2], seeds[5]), (seeds[3], seeds[4])],
+                                 team_id_to_owner_id, is_playoffs=True)
+        rows += get_matchup_rows(year, playoff_week, list(zip(seeds[6::2], seeds[7::2])), team_id_to_owner_id,
+                                 is_playoffs=True, is_consolation=True)
+        rows += get_matchup_rows(year, playoff_week + 1, [(seeds[0], seeds[2]), (seeds[1], seeds[3])],
+                                 team_id_to_owner_id, is_playoffs=True,
+                                 is_pending=year == 2000 + season_count - 1)
+    return rows
+
+
+def walk_pair_summaries(matchups: Sequence[Matchups], week_matchups: Sequence[Matchups], year: int,
+                        week: int) -> List[Tuple]:
+    pair_to_history = defaultdict(list)
+    for m in matchups:
+        if not (m.is_pending or m.is_consolation or m.is_playoffs or m.opponent_owner_id is None or
+                (m.year == year and m.matchup_id == week)):
+            pair_to_history[(m.owner_id, m.opponent_owner_id)].append(m)
+
+    summaries = list()
+    for m in week_matchups:
+        h2h_history = sorted(pair_to_history.get((m.owner_id, m.opponent_owner_id), []),
+                             key=lambda h: (-h.year, h.matchup_id))
+        wins = sum(1 for h in h2h_history if h.is_win)
+        streak, streak_type = 0, None
+        for h2h in h2h_history:
+            if streak == 0:
+                streak_type = h2h.is_win
+            if h2h.is_win != streak_type:
+                break
+            streak += 1
+        summaries.append((wins, len(h2h_history) - wins, streak, bool(streak_type) if streak else False))
+    return summaries
+
+
+def time_best(fn: Callable, repeat: int) -> float:
+    timings = list()
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def main():
+    args = parse_args()
+    random.seed(0)
+    rows = get_history(args.get("seasons"), args.get("teams"), args.get("weeks"))
+    matchups = [Matchups(**row) for row in rows]
+    years = sorted({row["year"] for row in rows})
+    week = args.get("weeks")
+    print(f"{len(years)} seasons, {args.get('teams')} teams, {len(rows)} matchup rows")
+
+    def load():
+        return analytics.load_matchups([tuple(row[c] for c in analytics.MATCHUP_COLUMNS) for row in rows])
+
+    arrays = load()
+    year_to_week_matchups = dict((year, [m for m in matchups if m.year == year and m.matchup_id == week])
+                                 for year in years)
+
+    def walk_summaries():
+        return [walk_pair_summaries(matchups, year_to_week_matchups[year], year, week) for year in years]
+
+    def vectorized_summaries():
+        summaries = list()
+        for year in years:
+            week_matchups = year_to_week_matchups[year]
+            summaries.append(analytics.get_pair_summaries(
+                arrays,
+                analytics.get_owner_indexes(arrays, [m.owner_id for m in week_matchups]),
+                analytics.get_owner_indexes(arrays, [m.opponent_owner_id for m in week_matchups]),
+                exclude=(year, week)))
+        return summaries
+
+    def to_summaries(summaries: Sequence[analytics.PairSummaries]) -> List:
+        return [[(int(w), int(l), int(st), bool(si) if st else False) for w, l, st, si in zip(*s)]
+                for s in summaries]
+
+    name = "h2h records and streaks"
+    print(f"{'load arrays':<24}  {time_best(load, args.get('repeat')) * 1000:8.2f} ms")
+    if walk_summaries() != to_summaries(vectorized_summaries()):
+        raise SystemExit(f"{name}: the vectorized results differ from the walked results")
+    walk_elapsed = time_best(walk_summaries, args.get("repeat"))
+    vectorized_elapsed = time_best(vectorized_summaries, args.get("repeat"))
+    print(f"{name:<24}  walk {walk_elapsed * 1000:8.2f} ms  numpy {vectorized_elapsed * 1000:8.2f} ms  "
+          f"{walk_elapsed / vectorized_elapsed:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
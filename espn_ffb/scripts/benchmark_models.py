@@ -0,0 +1,195 @@
+import argparse
+from decimal import Decimal
+from espn_ffb.espn import api
+from espn_ffb.espn.model.matchup_score import MatchupScore
+from espn_ffb.espn.model.member import Member
+from espn_ffb.espn.model.record import Record
+from espn_ffb.espn.model.team import Team
+import gc
+import random
+import time
+import tracemalloc
+from typing import Callable, List, Mapping, Sequence
+
+
+class BaselineModel:
+    """
+    The ESPN models before __slots__: every field in an instance dict, nested dicts included, and a reference to the
+    raw JSON dict.
+    """
+    FIELDS: Mapping[str, str] = dict()
+
+    def __init__(self, data: Mapping):
+        self._data = data
+        for attr, key in self.FIELDS.items():
+            setattr(self, attr, data.get(key))
+
+
+class BaselineRecord(BaselineModel):
+    FIELDS = Record.FIELDS
+
+
+class BaselineMember(BaselineModel):
+    FIELDS = Member.FIELDS
+
+
+class BaselineTeam(BaselineModel):
+    FIELDS = dict(Team.FIELDS, draft_strategy="draftStrategy", owners="owners", trade_block="tradeBlock",
+                  transaction_counter="transactionCounter", values_by_stat="valuesByStat")
+
+    def __init__(self, data: Mapping):
+        super().__init__(data)
+        self.record = BaselineRecord(data.get("record").get("overall"))
+
+
+class BaselineMatchupScore(BaselineModel):
+    FIELDS = MatchupScore.FIELDS
+
+    def __init__(self, data: Mapping):
+        super().__init__(data)
+        self.team_count = 0
+        for side in ("away", "home"):
+            side_data = data.get(side)
+            setattr(self, side, side_data)
+            if side_data is not None:
+                self.team_count += 1
+                setattr(self, f"{side}_adjustment", side_data.get("adjustment"))
+                setattr(self, f"{side}_team_id", side_data.get("teamId"))
+                setattr(self, f"{side}_tie_break", side_data.get("tiebreak"))
+                setattr(self, f"{side}_total_points", round(Decimal(side_data.get("totalPoints")), 2))
+        self.is_pending = self.winner == "UNDECIDED" and self.team_count == 2
+        self.is_playoffs = self.playoff_tier_type == "WINNERS_BRACKET"
+        self.is_win = self.winner == "HOME"
+        self.is_loss = self.winner == "AWAY"
+
+
+class BaselineLeagueSetting:
+    def __init__(self, data: Mapping):
+        self.league_id = data.get("id")
+        self.season_id = data.get("seasonId")
+        self.matchup_scores = [BaselineMatchupScore(matchup_score) for matchup_score in data.get("schedule")]
+        self.members = [BaselineMember(member) for member in data.get("members")]
+        self.teams = [BaselineTeam(team) for team in data.get("teams")]
+
+
+def parse_baseline(history: Sequence[Mapping]) -> List[BaselineLeagueSetting]:
+    return [BaselineLeagueSetting(data) for data in history]
+
+
+# name and parse function of every compared model implementation
+PARSERS = (
+    ("baseline dict models", parse_baseline),
+    ("slots, keep_data=True", lambda history: api.parse_league_settings(history, keep_data=True)),
+    ("slots, keep_data=False", lambda history: api.parse_league_settings(history, keep_data=False)),
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks parsing a multi-season league history into ESPN models.")
+    parser.add_argument('-s', '--seasons', help="The number of seasons", type=int, default=20)
+    parser.add_argument('-t', '--teams', help="The number of teams per season", type=int, default=12)
+    parser.add_argument('-w', '--weeks', help="The number of matchup periods per season", type=int, default=17)
+    parser.add_argument('-r', '--repeat', help="The number of timed runs", type=int, default=5)
+    return vars(parser.parse_args())
+
+
+def get_team(team_id: int) -> Mapping:
+    return {
+        "abbrev": f"T{team_id}", "currentProjectedRank": team_id, "divisionId": 0, "draftDayProjectedRank": team_id,
+        "draftStrategy": {"keeperPlayerIds": list(range(10))}, "id": team_id, "isActive": True,
+        "location": f"Location {team_id}", "logo": f"https://example.com/{team_id}.png", "logoType": "VECTOR",
+        "nickname": f"Nickname {team_id}", "owners": [f"{{OWNER-{team_id}}}"], "playoffSeed": team_id,
+        "points": random.uniform(1000, 2000), "pointsAdjusted": 0.0, "pointsDelta": 0.0,
+        "primaryOwner": f"{{OWNER-{team_id}}}", "rankCalculatedFinal": team_id, "rankFinal": team_id,
+        "record": {
+            "overall": {"wins": 7, "losses": 6, "ties": 0, "pointsFor": random.uniform(1000, 2000),
+                        "pointsAgainst": random.uniform(1000, 2000), "streakLength": 2, "streakType": "WIN",
+                        "gamesBack": 1.0, "percentage": 0.538},
+            "home": {"wins": 4, "losses": 3, "ties": 0}, "away": {"wins": 3, "losses": 3, "ties": 0},
+        },
+        "tradeBlock": {}, "transactionCounter": {"acquisitions": 20, "drops": 20, "trades": 1},
+        "valuesByStat": {str(stat): random.uniform(0, 100) for stat in range(20)}, "waiverRank": team_id,
+    }
+
+
+def get_season(season_id: int, team_count: int, week_count: int) -> Mapping:
+    schedule = list()
+    for week in range(1, week_count + 1):
+        for home_team_id in range(1, team_count + 1, 2):
+            schedule.append({
+                "id": len(schedule) + 1, "matchupPeriodId": week, "playoffTierType": "NONE", "winner": "HOME",
+                "home": {"teamId": home_team_id, "totalPoints": random.uniform(60, 160), "adjustment": 0.0,
+                         "tiebreak": 0.0, "pointsByScoringPeriod": {str(week): random.uniform(60, 160)}},
+                "away": {"teamId": home_team_id + 1, "totalPoints": random.uniform(60, 160), "adjustment": 0.0,
+                         "tiebreak": 0.0, "pointsByScoringPeriod": {str(week): random.uniform(60, 160)}},
+            })
+
+    return {
+        "id": 123456,
+        "seasonId": season_id,
+        "schedule": schedule,
+        "members": [{"id": f"{{OWNER-{i}}}", "displayName": f"owner{i}", "firstName": f"First {i}",
+                     "lastName": f"Last {i}", "isLeagueManager": i == 1} for i in range(1, team_count + 1)],
+        "teams": [get_team(i) for i in range(1, team_count + 1)],
+        "settings": {"scheduleSettings": {"playoffMatchupPeriodLength": 1, "playoffTeamCount": 6,
+                                          "matchupPeriodCount": week_count - 3, "matchupPeriodLength": 1}},
+    }
+
+
+def get_history(season_count: int, team_count: int, week_count: int) -> List[Mapping]:
+    return [get_season(2000 + i, team_count, week_count) for i in range(season_count)]
+
+
+def time_parse(history: Sequence[Mapping], parse: Callable, repeat: int) -> float:
+    """
+    Time parsing a league history.
+
+    :param history: list of league data
+    :param parse: the function parsing the league data into models
+    :param repeat: the number of timed runs
+    :return: the fastest run in seconds
+    """
+    timings = list()
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        parse(history)
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def measure_retained(args: Mapping, parse: Callable) -> int:
+    """
+    Measure the memory still held by the parsed models once the caller has dropped the raw league history.
+
+    :param args: dict of parsed arguments
+    :param parse: the function parsing the league data into models
+    :return: the retained memory in bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    history = get_history(args.get("seasons"), args.get("teams"), args.get("weeks"))
+    league_settings = parse(history)
+    del history
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del league_settings
+    return retained
+
+
+def main():
+    args = parse_args()
+    random.seed(0)
+    history = get_history(args.get("seasons"), args.get("teams"), args.get("weeks"))
+    matchup_count = sum(len(data["schedule"]) for data in history)
+    print(f"{len(history)} seasons, {matchup_count} matchup scores, "
+          f"{sum(len(data['teams']) for data in history)} teams")
+
+    for name, parse in PARSERS:
+        elapsed = time_parse(history, parse=parse, repeat=args.get("repeat"))
+        retained = measure_retained(args, parse=parse)
+        print(f"{name:<24}  parse {elapsed * 1000:8.1f} ms  retained {retained / 1024 / 1024:7.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+from espn_ffb import util
+from espn_ffb.db import migrate
+from espn_ffb.db.database import db
+# noinspection PyUnresolvedReferences
+from espn_ffb.db.model import champions, changes, matchups, owner_pairs, owner_seasons, owners, records, sackos, \
+    schema_migrations, sync_state, team_weeks, teams
+from flask import Flask
+import re
+from sqlalchemy import exc, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+from typing import List, Mapping, Set
+
+app = Flask(__name__)
+
+CHECK_SCHEMA = "espn_ffb_schema_check"
+# names PostgreSQL would silently truncate in raw migration DDL
+MIGRATION_IDENTIFIER = re.compile(r"\b(?:CONSTRAINT|INDEX IF NOT EXISTS|INDEX|TABLE IF NOT EXISTS|TABLE) (\w+)")
+
+
+def parse_args() -> Mapping:
+    parser = argparse.ArgumentParser(description="Checks that the schema and the migrations can be created on "
+                                                 "PostgreSQL.")
+    parser.add_argument('-e', '--environment', help="Also create the schema in a scratch schema of this "
+                                                    "environment's PostgreSQL database", type=str,
+                        choices=util.SUPPORTED_ENVIRONMENTS)
+    return vars(parser.parse_args())
+
+
+def compile_schema() -> List[str]:
+    """
+    Compile the DDL of every table and index for PostgreSQL, which rejects identifiers that are too long.
+
+    :return: list of errors
+    """
+    dialect = postgresql.dialect()
+    errors = list()
+    for table in db.metadata.sorted_tables:
+        for ddl in [CreateTable(table)] + [CreateIndex(index) for index in table.indexes]:
+            try:
+                str(ddl.compile(dialect=dialect))
+            except exc.IdentifierError as e:
+                errors.append(f"{table.name}: {e}")
+    return errors
+
+
+def check_migration_identifiers() -> List[str]:
+    """
+    Check the length of every table, constraint and index name created by the raw SQL migrations.
+
+    :return: list of errors
+    """
+    max_length = postgresql.dialect.max_identifier_length
+    errors = list()
+    for migration in migrate.MIGRATIONS:
+        for statement in migration.statements:
+            if callable(statement):
+                continue
+            for name in MIGRATION_IDENTIFIER.findall(statement):
+                if len(name) > max_length:
+                    errors.append(f"migration {migration.version}: {name} exceeds maximum length of {max_length} "
+                                  f"characters")
+    return errors
+
+
+def get_expected_names() -> Set[str]:
+    names = set()
+    for table in db.metadata.sorted_tables:
+        names.add(table.primary_key.name or f"{table.name}_pkey")
+        names.update(index.name for index in table.indexes)
+    return names
+
+
+def load_schema(session) -> List[str]:
+    """
+    Create every table in a scratch schema, check that PostgreSQL kept every constraint and index name, and drop it.
+
+    :param session: the database session, on PostgreSQL
+    :return: list of errors
+    """
+    session.execute(text(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE"))
+    session.execute(text(f"CREATE SCHEMA {CHECK_SCHEMA}"))
+    session.commit()
+    try:
+        check_connection = session.connection().execution_options(schema_translate_map={None: CHECK_SCHEMA})
+        db.metadata.create_all(bind=check_connection)
+        created = {row[0] for row in session.execute(text(
+            "SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = :schema AND c.relkind = 'i'"), dict(schema=CHECK_SCHEMA))}
+        session.commit()
+    finally:
+        session.rollback()
+        session.execute(text(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE"))
+        session.commit()
+    return [f"{name} was not created" for name in sorted(get_expected_names() - created)]
+
+
+def main():
+    args = parse_args()
+    errors = compile_schema() + check_migration_identifiers()
+
+    environment = args.get("environment")
+    if environment and not errors:
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = util.get_config(environment).DB_URI
+        db.init_app(app)
+        with app.app_context():
+            if db.engine.dialect.name != "postgresql":
+                raise SystemExit(f"The {environment} database is not PostgreSQL")
+            errors = load_schema(db.session)
+
+    for error in errors:
+        print(error)
+    if errors:
+        raise SystemExit(1)
+    print("ok, the schema can be created on PostgreSQL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+from decimal import Decimal
+from espn_ffb.db.database import db
+from espn_ffb.db.model.champions import Champions
+from espn_ffb.db.model.owner_seasons import OwnerSeasons
+from espn_ffb.db.model.owners import Owners
+from espn_ffb.db.model.sackos import Sackos
+from espn_ffb.db.query import Query
+from flask import Flask
+from sqlalchemy import event
+from typing import Mapping, Sequence
+
+app = Flask(__name__)
+
+LEAGUE_ID = 123456
+FIRST_YEAR = 2000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Checks that standings run a constant number of queries however "
+                                                 "many owners a league has.")
+    parser.add_argument('-o', '--owners', help="The owner counts to compare", type=int, nargs="+",
+                        default=[4, 16, 64])
+    parser.add_argument('-s', '--seasons', help="The number of seasons", type=int, default=10)
+    return vars(parser.parse_args())
+
+
+def insert_league(owner_count: int, season_count: int):
+    """
+    Replace the league with synthetic owners, owner-season totals, champions and sackos.
+
+    :param owner_count: the number of owners
+    :param season_count: the number of seasons
+    :return: None
+    """
+    db.drop_all()
+    db.create_all()
+
+    owner_ids = [f"{{OWNER-{i}}}" for i in range(owner_count)]
+    db.session.bulk_insert_mappings(Owners, [
+        dict(league_id=LEAGUE_ID, id=owner_id, username=f"owner{i}", first_name=f"First {i}", last_name=f"Last {i}")
+        for i, owner_id in enumerate(owner_ids)
+    ])
+    db.session.bulk_insert_mappings(OwnerSeasons, [
+        dict(league_id=LEAGUE_ID, year=FIRST_YEAR + year, owner_id=owner_id, wins=7, losses=6, ties=0,
+             points_for=Decimal("1500.25"), points_against=Decimal("1450.75"), playoff_games=i % 2,
+             playoff_wins=i % 2, playoff_losses=0, playoff_ties=0, playoff_points_for=Decimal("110.5") * (i % 2),
+             playoff_points_against=Decimal("99.5") * (i % 2))
+        for year in range(season_count) for i, owner_id in enumerate(owner_ids)
+    ])
+    for model in (Champions, Sackos):
+        db.session.bulk_insert_mappings(model, [
+            dict(league_id=LEAGUE_ID, year=FIRST_YEAR + year, owner_id=owner_ids[year % owner_count])
+            for year in range(season_count)
+        ])
+    db.session.commit()
+
+
+def count_queries(query: Query, year: int, is_playoffs: bool) -> int:
+    """
+    Count the SQL statements run to get standings.
+
+    :param query: the query object
+    :param year: the year, or None for all years
+    :param is_playoffs: get playoff instead of regular season standings
+    :return: the number of statements
+    """
+    statements = list()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        query.get_standings(year=year, is_playoffs=is_playoffs)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
+def get_query_counts(args: Mapping) -> Sequence[Mapping]:
+    query = Query(db, league_id=LEAGUE_ID)
+    query_counts = list()
+    for owner_count in args.get("owners"):
+        insert_league(owner_count, args.get("seasons"))
+        for year in (None, FIRST_YEAR):
+            for is_playoffs in (False, True):
+                query_counts.append(dict(owners=owner_count, year=year, is_playoffs=is_playoffs,
+                                         queries=count_queries(query, year=year, is_playoffs=is_playoffs)))
+    return query_counts
+
+
+def main():
+    args = parse_args()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite://"
+    db.init_app(app)
+
+    with app.app_context():
+        query_counts = get_query_counts(args)
+
+    for c in query_counts:
+        print(f"owners={c['owners']:<4}  year={c['year'] or 'overall':<8}  playoffs={c['is_playoffs']!s:<5}  "
+              f"queries={c['queries']}")
+
+    for year in (None, FIRST_YEAR):
+        for is_playoffs in (False, True):
+            counts = {c["queries"] for c in query_counts if c["year"] == year and c["is_playoffs"] == is_playoffs}
+            if len(counts) > 1:
+                raise SystemExit(f"Standings queries grow with the number of owners: {sorted(counts)}")
+    print("ok, the number of standings queries does not depend on the number of owners")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import argparse
 from espn_ffb import util
 from espn_ffb.db import create, insert
 from espn_ffb.db.database import db
+from espn_ffb.espn import cassette
 from flask import Flask
 from typing import Mapping
 
@@ -16,6 +17,7 @@ def parse_args() -> Mapping:
     parser = argparse.ArgumentParser(description="Create tables and insert into database.")
     parser.add_argument('-e', '--environment', help="The development environment", type=str, required=True,
                         choices=util.SUPPORTED_ENVIRONMENTS)
+    cassette.add_arguments(parser)
     return vars(parser.parse_args())
 
 
@@ -1,9 +1,11 @@
 from espn_ffb.config import Config, DevConfig, DockerConfig, ProdConfig
 from collections import namedtuple
+from flask import abort, current_app
+import functools
 import logging.handlers
 import os
 import re
-from typing import Type
+from typing import Optional, Sequence, Type
 
 REGULAR_SEASON = "regular"
 SUPPORTED_ENVIRONMENTS = {"dev", "docker", "prod"}
@@ -37,6 +39,46 @@ def get_config(environment) -> Type[Config]:
         return ProdConfig
 
 
+@functools.lru_cache(maxsize=None)
+def get_league_config(config: Type[Config], league_id: int) -> Type[Config]:
+    """
+    Get a config object scoped to a single league.
+
+    :param config: the config object
+    :param league_id: the league ID
+    :return: a config object whose LEAGUE_ID is the given league ID
+    """
+    if league_id == config.LEAGUE_ID:
+        return config
+    return type(config.__name__, (config,), {"LEAGUE_ID": league_id})
+
+
+def get_league_configs(config: Type[Config]) -> Sequence[Type[Config]]:
+    """
+    Get a config object for each configured league.
+
+    :param config: the config object
+    :return: list of config objects, one per league ID
+    """
+    return [get_league_config(config, league_id) for league_id in config.LEAGUE_IDS]
+
+
+def get_query(league_id: Optional[int] = None):
+    """
+    Get the app's query object, scoped to a league if one is given.
+
+    :param league_id: the league ID, or None for the default league
+    :return: the query object
+    :raises werkzeug.exceptions.NotFound: if the league is not configured
+    """
+    query = current_app.config.get("QUERY")
+    if league_id is None:
+        return query
+    if league_id not in current_app.config.get("LEAGUE_IDS"):
+        abort(404)
+    return query.for_league(league_id)
+
+
 def convert(name):
     s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
     return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
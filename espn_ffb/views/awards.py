@@ -1,8 +1,10 @@
 from flask import Blueprint, render_template
+from typing import Optional
 
 awards = Blueprint("awards", __name__, template_folder="templates")
 
 
 @awards.route('/awards/<int:year>', methods=['GET'])
-def show(year: int):
+@awards.route('/leagues/<int:league_id>/awards/<int:year>', methods=['GET'])
+def show(year: int, league_id: Optional[int] = None):
     return render_template(f"awards/{year}.html", title=f'{year} Awards')
@@ -1,5 +1,7 @@
 from collections import namedtuple
-from flask import Blueprint, current_app, render_template
+from espn_ffb import util
+from flask import Blueprint, render_template
+from typing import Optional
 
 champions = Blueprint("champions", __name__, template_folder="templates")
 TABLE_HEADERS = ['Year', 'Champion']
@@ -9,17 +11,17 @@ Record = namedtuple('Champions', COLUMN_NAMES)
 
 def get_records(query):
     records = list()
-    champions, owners = zip(*query.get_champions())
 
-    for c, o in zip(champions, owners):
+    for c, o in query.get_champions():
         records.append(Record(year=c.year, champion=o.first_name + " " + o.last_name))
 
     return records
 
 
 @champions.route('/champions', methods=['GET'])
-def show():
-    query = current_app.config.get("QUERY")
+@champions.route('/leagues/<int:league_id>/champions', methods=['GET'])
+def show(league_id: Optional[int] = None):
+    query = util.get_query(league_id)
     records = get_records(query)
 
     return render_template('champions.html', title='Champions', table_headers=TABLE_HEADERS,
@@ -0,0 +1,42 @@
+from espn_ffb import util
+from espn_ffb.db import journal
+from flask import Blueprint, abort, jsonify, request
+from typing import Optional
+
+changes = Blueprint("changes", __name__)
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+
+@changes.route('/api/changes', methods=['GET'])
+@changes.route('/leagues/<int:league_id>/api/changes', methods=['GET'])
+def show(league_id: Optional[int] = None):
+    query = util.get_query(league_id)
+
+    since = max(get_int_arg('since', default=0), 0)
+    limit = min(max(get_int_arg('limit', default=DEFAULT_LIMIT), 1), MAX_LIMIT)
+
+    records = query.get_changes(since=since, limit=limit)
+    return jsonify(
+        version=query.get_latest_change_version(),
+        next=records[-1].version if records else since,
+        has_more=len(records) == limit,
+        changes=[journal.to_json(c) for c in records],
+    )
+
+
+def get_int_arg(name: str, default: int) -> int:
+    """
+    Get an integer query argument, rejecting a malformed one with 400 instead of falling back to the default.
+
+    :param name: the argument name
+    :param default: the value if the argument is missing
+    :return: the argument value
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        abort(400, f"{name} must be an integer")
@@ -1,5 +1,6 @@
-from flask import Blueprint, current_app, render_template, request
+from flask import Blueprint, render_template, request
 from espn_ffb import util
+from typing import Optional
 
 h2h_records = Blueprint("h2h_records", __name__, template_folder="templates")
 TABLE_HEADERS = ['Opponent', 'Wins', 'Losses']
@@ -7,8 +8,9 @@ COLUMN_NAMES = ['opponent_name', 'wins', 'losses']
 
 
 @h2h_records.route('/h2h-records', methods=['GET'])
-def show():
-    query = current_app.config.get("QUERY")
+@h2h_records.route('/leagues/<int:league_id>/h2h-records', methods=['GET'])
+def show(league_id: Optional[int] = None):
+    query = util.get_query(league_id)
 
     matchup_type = request.args.get('matchup_type', default=util.REGULAR_SEASON)
     owner_id = request.args.get('owner_id', type=str)
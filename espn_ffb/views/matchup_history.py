@@ -1,5 +1,6 @@
-from flask import Blueprint, current_app, render_template, request
+from flask import Blueprint, render_template, request
 from espn_ffb import util
+from typing import Optional
 
 matchup_history = Blueprint("matchup_history", __name__, template_folder="templates")
 TABLE_HEADERS = ["Year", "Matchup ID", "Team", "Opponent Score", "Result"]
@@ -7,8 +8,9 @@ COLUMN_NAMES = ["year", "matchup_id", "team_score", "opponent_team_score", "is_w
 
 
 @matchup_history.route('/matchup-history', methods=['GET'])
-def show():
-    query = current_app.config.get("QUERY")
+@matchup_history.route('/leagues/<int:league_id>/matchup-history', methods=['GET'])
+def show(league_id: Optional[int] = None):
+    query = util.get_query(league_id)
 
     matchup_type = request.args.get('matchup_type', default=util.REGULAR_SEASON)
     owner_id = request.args.get('owner_id', type=str)
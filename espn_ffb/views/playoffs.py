@@ -4,6 +4,7 @@ playoffs = Blueprint("playoffs", __name__, template_folder="templates")
 
 
 @playoffs.route('/playoffs/<int:year>', methods=['GET'])
-def show(year):
+@playoffs.route('/leagues/<int:league_id>/playoffs/<int:year>', methods=['GET'])
+def show(year, league_id=None):
     # noinspection PyUnresolvedReferences
     return render_template(f"playoffs/{year}.html", title='{year} Playoffs')
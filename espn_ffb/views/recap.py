@@ -1,23 +1,23 @@
-from flask import Blueprint, current_app, render_template
+from flask import Blueprint, render_template
 from espn_ffb import util
 
 recap = Blueprint("recap", __name__, template_folder="templates")
 
 
 @recap.route('/recap/<int:year>/<int(fixed_digits=2):week>', methods=['GET'])
-def show(year, week):
-    query = current_app.config.get("QUERY")
+@recap.route('/leagues/<int:league_id>/recap/<int:year>/<int(fixed_digits=2):week>', methods=['GET'])
+def show(year, week, league_id=None):
+    query = util.get_query(league_id)
 
     team_ids = set(query.get_distinct_matchup_team_ids(year)[week])
     matchups = [m for m in query.get_matchups(year) if m.matchup_id == week and m.team_id in team_ids]
     matchups = sorted(matchups, key=lambda m: m.team_id)
-    win_streaks = query.get_win_streak_by_year(matchups, year, week)
     team_id_to_record = query.get_team_id_to_record(year, week)
     team_id_to_team_name = query.get_team_id_to_team_name(year)
-    h2h_records = query.get_h2h_record_current(matchups, year, week)
+    h2h_summaries = query.get_h2h_summaries(matchups, year, week)
 
     recaps = list()
-    for m, ws, h2h_record in zip(matchups, win_streaks, h2h_records):
+    for m, (h2h_record, ws) in zip(matchups, h2h_summaries):
         streak_owner = team_id_to_team_name.get(ws.streak_owner)
 
         recaps.append(
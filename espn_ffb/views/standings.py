@@ -1,5 +1,6 @@
-from flask import Blueprint, current_app, render_template, request
+from flask import Blueprint, render_template, request
 from espn_ffb import util
+from typing import Optional
 
 standings = Blueprint("standings", __name__, template_folder="templates")
 TABLE_HEADERS = ["Name", "Wins", "Losses", "Ties", "Win Percentage", "Points For", "Points Against", "Average Points For",
@@ -13,9 +14,10 @@ def get_owner_id_to_name(query):
 
 
 @standings.route('/standings/<string:year>', methods=['GET'])
-def show(year: str):
+@standings.route('/leagues/<int:league_id>/standings/<string:year>', methods=['GET'])
+def show(year: str, league_id: Optional[int] = None):
     # return "<h1 style='color:blue'>Hello There!</h1>" + str(sys.argv[1])
-    query = current_app.config.get("QUERY")
+    query = util.get_query(league_id)
 
     matchup_type = request.args.get('matchup_type', default=util.REGULAR_SEASON)
     owner_id_to_name = get_owner_id_to_name(query)